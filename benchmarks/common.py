@@ -0,0 +1,16 @@
+# coding=UTF-8
+import os
+import sys
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'fake_k8s'))
+import settings  # noqa: E402
+
+app = Flask(__name__)
+app.config.from_object(settings)
+app.config['STORE_CONFIG'] = dict(settings.STORE_CONFIG,
+                                  STORE_PERSISTENCE=None)
+app.app_context().push()
+
+from fixtures import DEPLOYMENT, POD, fixtures  # noqa: E402,F401
@@ -0,0 +1,56 @@
+# coding=UTF-8
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def change(old, new):
+    if not old:
+        return 0.0
+    return (new - old) / float(old)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare two harness.py result files')
+    parser.add_argument('baseline', help='Results of the reference commit')
+    parser.add_argument('candidate', help='Results of the commit under test')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative p50/p99 increase or ops/sec decrease '
+                             'reported as a regression (default: 0.1)')
+    args = parser.parse_args()
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    print('baseline:  %s' % baseline['meta'].get('commit'))
+    print('candidate: %s' % candidate['meta'].get('commit'))
+    print('%-32s %10s %10s %10s %10s' % (
+        'operation', 'p50', 'p99', 'ops/sec', 'errors'))
+    regressions = []
+    for name in sorted(set(baseline['results']) & set(candidate['results'])):
+        old, new = baseline['results'][name], candidate['results'][name]
+        p50 = change(old['p50_ms'], new['p50_ms'])
+        p99 = change(old['p99_ms'], new['p99_ms'])
+        ops = change(old['ops_per_sec'], new['ops_per_sec'])
+        regressed = (p50 > args.threshold or p99 > args.threshold or
+                     -ops > args.threshold or new['errors'] > old['errors'])
+        if regressed:
+            regressions.append(name)
+        print('%-32s %+9.1f%% %+9.1f%% %+9.1f%% %+10d%s' % (
+            name, p50 * 100, p99 * 100, ops * 100,
+            new['errors'] - old['errors'], '  <-' if regressed else ''))
+    for name in sorted(set(baseline['results']) ^ set(candidate['results'])):
+        print('%-32s %s' % (name, 'only in baseline'
+                            if name in baseline['results']
+                            else 'only in candidate'))
+    if regressions:
+        print('%d regression(s) above %.0f%%: %s' % (
+            len(regressions), args.threshold * 100, ', '.join(regressions)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
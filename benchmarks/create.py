@@ -0,0 +1,42 @@
+# coding=UTF-8
+import argparse
+import time
+from common import DEPLOYMENT, POD, fixtures
+import fake_objects
+
+
+KINDS = [
+    ('Pod', 'pods', POD),
+    ('Deployment', 'deployments', DEPLOYMENT)
+]
+
+
+def measure(kind, key, fixture, count, mode):
+    fake_objects.RENDER_MODE = mode
+    obj_class = getattr(fake_objects, kind)
+    burst = [obj_class(kind, obj['metadata']['name'],
+                       obj['metadata']['namespace'], key, obj)
+             for obj in fixtures(fixture, count, prefix=mode)]
+    start = time.time()
+    for obj in burst:
+        obj.create()
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Create latency per kind and render mode')
+    parser.add_argument('--count', type=int, default=2000,
+                        help='Number of objects created per kind and mode')
+    args = parser.parse_args()
+    print('%-12s %-10s %10s %14s' % ('kind', 'mode', 'total (s)',
+                                     'per create (us)'))
+    for kind, key, fixture in KINDS:
+        for mode in ['template', 'builder']:
+            elapsed = measure(kind, key, fixture, args.count, mode)
+            print('%-12s %-10s %10.3f %14.1f' % (kind, mode, elapsed,
+                                                 elapsed / args.count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# coding=UTF-8
+import copy
+
+
+POD = {
+    'apiVersion': 'v1',
+    'kind': 'Pod',
+    'metadata': {
+        'name': 'bench',
+        'namespace': 'default',
+        'labels': {'app': 'bench', 'tier': 'web'},
+        'annotations': {'owner': 'benchmark'}
+    },
+    'spec': {
+        'containers': [{
+            'name': 'nginx',
+            'image': 'nginx:1.15',
+            'ports': [{'name': 'http', 'containerPort': 80}],
+            'resources': {'limits': {'cpu': '500m', 'memory': '128Mi'}},
+            'volumeMounts': [{'name': 'data', 'mountPath': '/data'}]
+        }],
+        'restartPolicy': 'Always',
+        'volumes': [{'name': 'data', 'emptyDir': {}}]
+    }
+}
+
+DEPLOYMENT = {
+    'apiVersion': 'apps/v1',
+    'kind': 'Deployment',
+    'metadata': {
+        'name': 'bench',
+        'namespace': 'default',
+        'labels': {'app': 'bench'}
+    },
+    'spec': {
+        'replicas': 1,
+        'template': {
+            'metadata': {'labels': {'app': 'bench'}},
+            'spec': POD['spec']
+        }
+    }
+}
+
+SERVICE = {
+    'apiVersion': 'v1',
+    'kind': 'Service',
+    'metadata': {
+        'name': 'bench',
+        'namespace': 'default',
+        'labels': {'app': 'bench'}
+    },
+    'spec': {
+        'selector': {'app': 'bench'},
+        'ports': [{'name': 'http', 'port': 80, 'targetPort': 80}]
+    }
+}
+
+SECRET = {
+    'apiVersion': 'v1',
+    'kind': 'Secret',
+    'metadata': {
+        'name': 'bench',
+        'namespace': 'default',
+        'labels': {'app': 'bench'}
+    },
+    'type': 'Opaque',
+    'data': {'key': 'dmFsdWU='}
+}
+
+NODE = {
+    'apiVersion': 'v1',
+    'kind': 'Node',
+    'metadata': {
+        'name': 'bench',
+        'labels': {'zone': 'bench'}
+    },
+    'spec': {}
+}
+
+
+def fixtures(fixture, count, prefix='bench'):
+    for index in xrange(count):
+        obj = copy.deepcopy(fixture)
+        obj['metadata']['name'] = '%s-%d' % (prefix, index)
+        yield obj
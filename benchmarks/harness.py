@@ -0,0 +1,274 @@
+# coding=UTF-8
+import argparse
+import copy
+import httplib
+import json
+import os
+import platform
+import random
+import string
+import subprocess
+import sys
+import tempfile
+import time
+import urllib
+import urlparse
+from datetime import datetime
+from fixtures import DEPLOYMENT, NODE, POD, SECRET, SERVICE, fixtures
+
+FAKE_K8S = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        os.pardir, 'fake_k8s')
+
+KINDS = [
+    ('pods', '/api/v1/namespaces/%s/pods', POD),
+    ('services', '/api/v1/namespaces/%s/services', SERVICE),
+    ('secrets', '/api/v1/namespaces/%s/secrets', SECRET),
+    ('deployments', '/apis/apps/v1/namespaces/%s/deployments', DEPLOYMENT)
+]
+
+DISCOVERY = ['/version', '/api', '/apis', '/api/v1', '/apis/apps/v1',
+             '/openapi/v2']
+
+LABEL_SELECTOR = 'tier in (frontend,backend),app=web,!canary'
+FIELD_SELECTOR = 'spec.nodeName=node-1'
+
+
+class InProcessClient(object):
+    target = 'inprocess'
+
+    def __init__(self, args):
+        os.chdir(FAKE_K8S)
+        import cli
+        import settings
+        cli.configure(settings, args)
+        import server
+        self.client = server.app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(
+            path, method=method, content_type='application/json',
+            data=None if body is None else json.dumps(body))
+        response.get_data()
+        return response.status_code
+
+
+class SocketClient(object):
+    target = 'socket'
+
+    def __init__(self, args):
+        url = urlparse.urlparse(args.url)
+        self.connection = httplib.HTTPConnection(url.hostname,
+                                                 url.port or 80)
+
+    def request(self, method, path, body=None):
+        self.connection.request(
+            method, path, None if body is None else json.dumps(body),
+            {'Content-Type': 'application/json'})
+        response = self.connection.getresponse()
+        response.read()
+        return response.status
+
+
+def percentile(latencies, fraction):
+    return latencies[int(round(fraction * (len(latencies) - 1)))]
+
+
+def measure(results, name, func, items):
+    latencies = []
+    errors = 0
+    start = time.time()
+    for item in items:
+        begin = time.time()
+        status = func(item)
+        latencies.append(time.time() - begin)
+        errors += status >= 400
+    elapsed = time.time() - start
+    latencies.sort()
+    results[name] = {
+        'count': len(latencies),
+        'errors': errors,
+        'p50_ms': percentile(latencies, 0.5) * 1e3,
+        'p99_ms': percentile(latencies, 0.99) * 1e3,
+        'ops_per_sec': len(latencies) / elapsed if elapsed else 0.0
+    }
+
+
+def with_name(fixture, name, namespace, **spec):
+    obj = copy.deepcopy(fixture)
+    obj['metadata'].update(name=name, namespace=namespace)
+    obj.setdefault('spec', {}).update(spec)
+    return obj
+
+
+def bench_crud(client, args, namespace, results):
+    for kind, path, fixture in KINDS:
+        path = path % namespace
+        objs = list(fixtures(fixture, args.count, prefix=kind))
+        for obj in objs:
+            obj['metadata']['namespace'] = namespace
+            if kind == 'deployments':
+                obj['spec']['replicas'] = 1
+        names = [obj['metadata']['name'] for obj in objs]
+        measure(results, '%s/create' % kind,
+                lambda obj: client.request('POST', path, obj), objs)
+        measure(results, '%s/get' % kind,
+                lambda name: client.request('GET', '%s/%s' % (path, name)),
+                names)
+        measure(results, '%s/list' % kind,
+                lambda _: client.request('GET', path),
+                xrange(args.list_repeat))
+        measure(results, '%s/patch' % kind,
+                lambda name: client.request(
+                    'PATCH', '%s/%s' % (path, name),
+                    {'metadata': {'labels': {'patched': 'true'}}}),
+                names)
+        measure(results, '%s/delete' % kind,
+                lambda name: client.request('DELETE',
+                                            '%s/%s' % (path, name)),
+                names)
+
+
+def bench_selectors(client, args, namespace, results):
+    path = '/api/v1/namespaces/%s/pods' % namespace
+    rand = random.Random(0)
+    for obj in fixtures(POD, args.selector_objects, prefix='selector'):
+        obj['metadata']['namespace'] = namespace
+        obj['metadata']['labels'] = {
+            'app': rand.choice(['web', 'db', 'cache']),
+            'tier': rand.choice(['frontend', 'backend', 'data'])}
+        if rand.random() < 0.1:
+            obj['metadata']['labels']['canary'] = 'true'
+        obj['spec']['nodeName'] = 'node-%d' % rand.randint(0, 9)
+        client.request('POST', path, obj)
+    measure(results, 'selectors/label',
+            lambda _: client.request(
+                'GET', '%s?labelSelector=%s' % (
+                    path, urllib.quote(LABEL_SELECTOR))),
+            xrange(args.list_repeat))
+    measure(results, 'selectors/label+field',
+            lambda _: client.request(
+                'GET', '%s?labelSelector=%s&fieldSelector=%s' % (
+                    path, urllib.quote(LABEL_SELECTOR),
+                    urllib.quote(FIELD_SELECTOR))),
+            xrange(args.list_repeat))
+    measure(results, 'selectors/page',
+            lambda _: client.request('GET', '%s?limit=100' % path),
+            xrange(args.list_repeat))
+
+
+def bench_fanout(client, args, namespace, results):
+    path = '/apis/apps/v1/namespaces/%s/deployments' % namespace
+    names = ['fanout-%d' % index for index in xrange(args.fanout_repeat)]
+    measure(results, 'fanout/create',
+            lambda name: client.request(
+                'POST', path, with_name(DEPLOYMENT, name, namespace,
+                                        replicas=args.replicas)),
+            names)
+    measure(results, 'fanout/scale',
+            lambda name: client.request(
+                'PATCH', '%s/%s' % (path, name),
+                {'spec': {'replicas': args.replicas / 2}}),
+            names)
+    measure(results, 'fanout/delete',
+            lambda name: client.request('DELETE', '%s/%s' % (path, name)),
+            names)
+
+
+def bench_discovery(client, args, namespace, results):
+    for path in DISCOVERY:
+        measure(results, 'discovery%s' % path,
+                lambda _: client.request('GET', path),
+                xrange(args.list_repeat))
+
+
+SCENARIOS = [
+    ('crud', bench_crud),
+    ('fanout', bench_fanout),
+    ('selectors', bench_selectors),
+    ('discovery', bench_discovery)
+]
+
+
+def setup(client, namespace):
+    client.request('POST', '/api/v1/namespaces',
+                   {'apiVersion': 'v1', 'kind': 'Namespace',
+                    'metadata': {'name': namespace}})
+    for node in fixtures(NODE, 10, prefix='node'):
+        client.request('POST', '/api/v1/nodes', node)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=FAKE_K8S,
+            stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Latency and throughput of the fake API server')
+    parser.add_argument('--url',
+                        help='Benchmark a running server at this URL '
+                             'instead of the in-process test client')
+    parser.add_argument('--scenario', action='append',
+                        choices=[name for name, _ in SCENARIOS],
+                        help='Scenario to run, may be repeated '
+                             '(default: all)')
+    parser.add_argument('--count', type=int, default=200,
+                        help='Objects per kind in the CRUD scenario')
+    parser.add_argument('--list-repeat', dest='list_repeat', type=int,
+                        default=20, help='Requests per list measurement')
+    parser.add_argument('--selector-objects', dest='selector_objects',
+                        type=int, default=2000,
+                        help='Pods created for the selector scenario')
+    parser.add_argument('--replicas', type=int, default=100,
+                        help='Replicas of the fan-out Deployment')
+    parser.add_argument('--fanout-repeat', dest='fanout_repeat', type=int,
+                        default=5, help='Deployments in the fan-out '
+                                        'scenario')
+    parser.add_argument('--store', choices=['memory', 'sqlite'],
+                        help='Storage backend of the in-process server')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    sys.path.insert(0, FAKE_K8S)
+    import cli
+    args = parser.parse_args(namespace=cli.base_parser().parse_args([]))
+    args.cache_dir = tempfile.mkdtemp(prefix='fake_k8s_bench')
+
+    client = SocketClient(args) if args.url else InProcessClient(args)
+    namespace = 'bench-%s' % ''.join(
+        random.choice(string.ascii_lowercase) for _ in xrange(6))
+    setup(client, namespace)
+    results = {}
+    selected = args.scenario or [name for name, _ in SCENARIOS]
+    for name, scenario in SCENARIOS:
+        if name in selected:
+            scenario(client, args, namespace, results)
+
+    print('%-32s %8s %7s %10s %10s %12s' % (
+        'operation', 'count', 'errors', 'p50 (ms)', 'p99 (ms)', 'ops/sec'))
+    for name in sorted(results):
+        result = results[name]
+        print('%-32s %8d %7d %10.2f %10.2f %12.1f' % (
+            name, result['count'], result['errors'], result['p50_ms'],
+            result['p99_ms'], result['ops_per_sec']))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'commit': git_commit(),
+                    'date': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'python': platform.python_version(),
+                    'target': client.target,
+                    'store': args.store,
+                    'options': dict((key, getattr(args, key)) for key in [
+                        'count', 'list_repeat', 'selector_objects',
+                        'replicas', 'fanout_repeat'])
+                },
+                'results': results
+            }, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# coding=UTF-8
+import argparse
+import time
+from datetime import datetime
+from common import POD, fixtures
+import fake_objects
+import utils
+
+
+def render_uncompiled(pod):
+    env = utils.JinjaEnvironment()
+    tmpl = env.from_string(fake_objects.Pod.template)
+    return tmpl.render(obj=pod, current_time=datetime.utcnow()).strip()
+
+
+def render_compiled(pod):
+    tmpl = fake_objects.Pod.get_template()
+    return tmpl.render(obj=pod, current_time=datetime.utcnow()).strip()
+
+
+def measure(render, count):
+    burst = list(fixtures(POD, count))
+    start = time.time()
+    for pod in burst:
+        render(pod)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Per-create Pod template rendering cost')
+    parser.add_argument('--pods', type=int, default=10000,
+                        help='Number of pods in the burst')
+    args = parser.parse_args()
+    results = [('uncompiled', measure(render_uncompiled, args.pods)),
+               ('compiled', measure(render_compiled, args.pods))]
+    print('%-12s %10s %14s' % ('mode', 'total (s)', 'per create (us)'))
+    for mode, elapsed in results:
+        print('%-12s %10.3f %14.1f' % (mode, elapsed,
+                                        elapsed / args.pods * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# coding=UTF-8
+import argparse
+import random
+import time
+import common  # noqa: F401
+import columns
+import store
+import utils
+
+
+LABEL_SELECTOR = 'tier in (frontend,backend),app=web,!canary'
+FIELD_SELECTOR = 'spec.nodeName=node-1,status.phase!=Failed'
+
+
+def gen_objects(count, seed=0):
+    rand = random.Random(seed)
+    for index in xrange(count):
+        labels = {'app': rand.choice(['web', 'db', 'cache']),
+                  'tier': rand.choice(['frontend', 'backend', 'data'])}
+        if rand.random() < 0.1:
+            labels['canary'] = 'true'
+        yield {
+            'metadata': {'name': 'bench-%d' % index, 'namespace': 'default',
+                         'labels': labels},
+            'spec': {'nodeName': 'node-%d' % rand.randint(0, 9)},
+            'status': {'phase': rand.choice(['Running', 'Pending', 'Failed'])}
+        }
+
+
+def parse():
+    return (list(utils.parse_label_selector(LABEL_SELECTOR)) +
+            list(utils.parse_field_selector(FIELD_SELECTOR)))
+
+
+def measure(func, repeat):
+    start = time.time()
+    for _ in xrange(repeat):
+        result = func()
+    return (time.time() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Mixed label/field selector cost on a large list')
+    parser.add_argument('--objects', type=int, default=100000,
+                        help='Number of objects in the list')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of list requests measured')
+    args = parser.parse_args()
+    objects = list(gen_objects(args.objects))
+    memory = store.MemoryStore()
+    memory.create_many('pods', objects)
+    selectors = parse()
+
+    parsed, _ = measure(parse, 1000)
+    scan, matched = measure(
+        lambda: [obj for obj in objects
+                 if all(selector(obj) for selector in selectors)],
+        args.repeat)
+    query, _ = measure(lambda: memory.query('pods', selectors), args.repeat)
+    phases = [('parse (cached)', parsed), ('predicate scan', scan),
+              ('indexed query', query)]
+    if columns.numpy is not None:
+        columnar = store.MemoryStore(columnar_index=True)
+        columnar.create_many('pods', objects)
+        elapsed, _ = measure(lambda: columnar.query('pods', selectors),
+                             args.repeat)
+        phases.append(('columnar query', elapsed))
+    print('label selector: %s' % LABEL_SELECTOR)
+    print('field selector: %s' % FIELD_SELECTOR)
+    print('%d objects, %d matched' % (args.objects, len(matched)))
+    print('%-24s %12s' % ('phase', 'time (ms)'))
+    for phase, elapsed in phases:
+        print('%-24s %12.3f' % (phase, elapsed * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# coding=UTF-8
+import argparse
+import resource
+import subprocess
+import sys
+import time
+from common import POD, app, fixtures
+from flask import json
+from werkzeug.test import create_environ
+import utils
+
+
+def buffered(content):
+    return app.response_class(response=json.dumps(content),
+                              mimetype='application/json')
+
+
+def streamed(content):
+    return app.response_class(response=utils.iter_json(content),
+                              mimetype='application/json')
+
+
+MODES = {
+    'buffered': buffered,
+    'streamed': streamed
+}
+
+
+def measure(mode, count):
+    content = {'items': list(fixtures(POD, count)), 'kind': 'PodList',
+               'apiVersion': 'v1', 'metadata': {'resourceVersion': '1'}}
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    app_iter = MODES[mode](content)(create_environ(), lambda *args: None)
+    size = len(next(app_iter))
+    first_byte = time.time() - start
+    for chunk in app_iter:
+        size += len(chunk)
+    elapsed = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    print('%d %f %f %d' % (size, first_byte, elapsed, peak))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='List serialisation time-to-first-byte and peak RSS')
+    parser.add_argument('--items', type=int, nargs='+',
+                        default=[10000, 100000],
+                        help='List sizes to serialise')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'COUNT'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        measure(args.child[0], int(args.child[1]))
+        return
+    print('%-8s %-10s %10s %10s %10s %14s' % (
+        'items', 'mode', 'size (MB)', 'ttfb (ms)', 'total (s)',
+        'peak RSS (MB)'))
+    for count in args.items:
+        for mode in ['buffered', 'streamed']:
+            output = subprocess.check_output(
+                [sys.executable, __file__, '--child', mode, str(count)])
+            size, first_byte, elapsed, peak = output.split()
+            print('%-8d %-10s %10.1f %10.1f %10.3f %14.1f' % (
+                count, mode, int(size) / 1048576.0, float(first_byte) * 1e3,
+                float(elapsed), int(peak) / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+# coding=UTF-8
+from gevent import monkey
+monkey.patch_all()
+
+import cli  # noqa: E402
+import settings  # noqa: E402
+from gevent.pool import Pool  # noqa: E402
+from gevent.pywsgi import WSGIServer  # noqa: E402
+
+
+def parse_args():
+    parser = cli.base_parser(
+        description='Serve the fake API from a single gevent event loop')
+    parser.add_argument('--max-connections', dest='max_connections',
+                        type=int, default=10000,
+                        help='Maximum number of open connections')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    cli.configure(settings, args)
+    import server
+    http_server = WSGIServer(('0.0.0.0', 6443), server.app,
+                             backlog=args.backlog,
+                             spawn=Pool(args.max_connections))
+    http_server.serve_forever()
@@ -0,0 +1,81 @@
+# coding=UTF-8
+import argparse
+
+
+def base_parser(**kwargs):
+    parser = argparse.ArgumentParser(**kwargs)
+    parser.add_argument('--cache-dir', dest='cache_dir',
+                        help='Directory to store cache')
+    parser.add_argument('--backlog', type=int, default=2048,
+                        help='Maximum number of pending connections')
+    parser.add_argument('--store', choices=['memory', 'sqlite'],
+                        help='Storage backend, sqlite is required for more '
+                             'than one worker')
+    parser.add_argument('--persistence',
+                        choices=['filesystem', 'wal', 'none'],
+                        help='How the memory store persists objects '
+                             '(default none), wal appends each change to a '
+                             'write-ahead log')
+    parser.add_argument('--wal-sync', dest='wal_sync',
+                        choices=['always', 'batch', 'interval', 'none'],
+                        help='When the write-ahead log is fsynced: on every '
+                             'write, once per group of concurrent writes, '
+                             'periodically or never')
+    parser.add_argument('--forks', action='store_true',
+                        help='Allow copy-on-write forks of the cluster, '
+                             'selected with a /forks/<name> URL prefix or an '
+                             'X-Fake-K8s-Fork header')
+    parser.add_argument('--scheduler',
+                        choices=['random', 'spread', 'least-allocated'],
+                        help='How pods are placed on the nodes that match '
+                             'their node selector and affinity')
+    parser.add_argument('--scheduler-seed', dest='scheduler_seed', type=int,
+                        help='Seed the scheduler for reproducible placements')
+    parser.add_argument('--debug', action='store_true',
+                        help='Enable Flask debug mode')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Time each request phase and expose the '
+                             'histograms at /metrics')
+    parser.add_argument('--server-timing', dest='server_timing',
+                        action='store_true',
+                        help='Report request phase timings in a '
+                             'Server-Timing response header')
+    parser.add_argument('--profiler', action='store_true',
+                        help='Enable the /debug/profile endpoint')
+    parser.add_argument('--load', action='append', metavar='PATH',
+                        help='Bulk load objects from a JSON, NDJSON or YAML '
+                             'file at startup, may be repeated')
+    parser.add_argument('--restore', metavar='PATH',
+                        help='Restore a snapshot file at startup, before '
+                             'any --load')
+    return parser
+
+
+def configure(settings, args, workers=1):
+    if args.cache_dir:
+        settings.CACHE_CONFIG['CACHE_DIR'] = args.cache_dir
+    store_type = args.store or ('sqlite' if workers > 1 else None)
+    if store_type:
+        settings.STORE_CONFIG = dict(settings.STORE_CONFIG,
+                                     STORE_TYPE=store_type)
+    if args.persistence:
+        settings.STORE_CONFIG = dict(
+            settings.STORE_CONFIG, STORE_PERSISTENCE=None
+            if args.persistence == 'none' else args.persistence)
+    if args.wal_sync:
+        settings.STORE_CONFIG = dict(settings.STORE_CONFIG,
+                                     WAL_SYNC=args.wal_sync)
+    if args.forks:
+        settings.STORE_CONFIG = dict(settings.STORE_CONFIG, FORKS=True)
+    if args.scheduler:
+        settings.SCHEDULER_CONFIG = dict(settings.SCHEDULER_CONFIG,
+                                         STRATEGY=args.scheduler)
+    if args.scheduler_seed is not None:
+        settings.SCHEDULER_CONFIG = dict(settings.SCHEDULER_CONFIG,
+                                         SEED=args.scheduler_seed)
+    settings.DEBUG = settings.DEBUG or args.debug
+    settings.METRICS = settings.METRICS or args.metrics
+    settings.SERVER_TIMING = settings.SERVER_TIMING or args.server_timing
+    settings.PROFILER = settings.PROFILER or args.profiler
+    settings.LOAD_PATHS = settings.LOAD_PATHS + (args.load or [])
+    settings.RESTORE_PATH = args.restore or settings.RESTORE_PATH
@@ -0,0 +1,132 @@
+# coding=UTF-8
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+ABSENT = 0
+OTHER = -1
+UNKNOWN = -2
+
+FIELDS = (
+    ('metadata', 'namespace'),
+    ('spec', 'nodeName'),
+    ('status', 'phase')
+)
+
+
+class Interner(object):
+    def __init__(self):
+        self.codes = {}
+
+    def intern(self, value):
+        if value is None:
+            return ABSENT
+        if not isinstance(value, basestring):
+            return OTHER
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.codes) + 1
+        return code
+
+    def lookup(self, value):
+        return self.codes.get(value, UNKNOWN)
+
+
+def field_value(obj, path):
+    for field in path:
+        if not isinstance(obj, dict):
+            return OTHER
+        obj = obj.get(field)
+    return obj
+
+
+class ColumnarIndex(object):
+    def __init__(self, interner, capacity=1024):
+        self.interner = interner
+        self.capacity = capacity
+        self.size = 0
+        self.dead = 0
+        self.rows = {}
+        self.keys = []
+        self.alive = numpy.zeros(capacity, dtype=bool)
+        self.columns = {}
+
+    def _column(self, name):
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[name] = numpy.zeros(self.capacity,
+                                                      dtype=numpy.int32)
+        return column
+
+    def _grow(self):
+        self.capacity *= 2
+        self.alive = numpy.resize(self.alive, self.capacity)
+        self.alive[self.size:] = False
+        for name, column in self.columns.items():
+            column = self.columns[name] = numpy.resize(column, self.capacity)
+            column[self.size:] = ABSENT
+
+    def _clear(self, row, obj):
+        for key in obj['metadata'].get('labels') or {}:
+            self.columns[('label', key)][row] = ABSENT
+        for path in FIELDS:
+            self.columns[('field', path)][row] = ABSENT
+
+    def add(self, key, obj, old=None):
+        row = self.rows.get(key)
+        if row is None:
+            if self.size == self.capacity:
+                self._grow()
+            row = self.rows[key] = self.size
+            self.keys.append(key)
+            self.alive[row] = True
+            self.size += 1
+        elif old is not None:
+            self._clear(row, old)
+        for label, value in (obj['metadata'].get('labels') or {}).iteritems():
+            self._column(('label', label))[row] = \
+                OTHER if value is None else self.interner.intern(value)
+        for path in FIELDS:
+            self._column(('field', path))[row] = \
+                self.interner.intern(field_value(obj, path))
+
+    def remove(self, key, obj):
+        row = self.rows.pop(key)
+        self._clear(row, obj)
+        self.alive[row] = False
+        self.keys[row] = None
+        self.dead += 1
+
+    def rebuild(self, objects):
+        self.__init__(self.interner, max(1024, len(objects) * 2))
+        for key, obj in objects.iteritems():
+            self.add(key, obj)
+
+    def mask(self, name, values, negate):
+        column = self.columns.get(name)
+        if column is None:
+            column = numpy.zeros(self.size, dtype=numpy.int32)
+        else:
+            column = column[:self.size]
+        if values is None:
+            matched = column != ABSENT
+        elif len(values) == 1:
+            matched = column == self.interner.lookup(next(iter(values)))
+        else:
+            matched = numpy.in1d(column, [self.interner.lookup(value)
+                                          for value in values])
+        return ~matched if negate else matched
+
+    def select(self, filters):
+        matched = self.alive[:self.size].copy()
+        for name, values, negate in filters:
+            matched &= self.mask(name, values, negate)
+        return [self.keys[row] for row in numpy.flatnonzero(matched)]
+
+
+def create_index(interner):
+    if numpy is None:
+        return None
+    return ColumnarIndex(interner)
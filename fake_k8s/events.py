@@ -0,0 +1,149 @@
+# coding=UTF-8
+import threading
+import time
+from collections import deque
+
+
+ADDED = 'ADDED'
+MODIFIED = 'MODIFIED'
+DELETED = 'DELETED'
+ERROR = 'ERROR'
+
+
+class Expired(Exception):
+    pass
+
+
+class Event(object):
+    __slots__ = ('revision', 'type', 'obj', 'old')
+
+    def __init__(self, revision, event_type, obj, old=None):
+        self.revision = revision
+        self.type = event_type
+        self.obj = obj
+        self.old = old
+
+
+class EventBus(object):
+    def __init__(self, history_size, tick=1):
+        self.history_size = history_size
+        self.tick = tick
+        self.revision = 0
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._histories = {}
+        self._compacted = {}
+        self._floor = 0
+        self._conditions = {}
+        self._ticker = None
+
+    def _condition(self, resource):
+        condition = self._conditions.get(resource)
+        if condition is None:
+            condition = self._conditions.setdefault(
+                resource, threading.Condition(self._lock))
+        return condition
+
+    def _start_ticker(self):
+        if self._ticker is not None:
+            return
+        self._ticker = threading.Thread(target=self._tick)
+        self._ticker.daemon = True
+        self._ticker.start()
+
+    def _tick(self):
+        while True:
+            time.sleep(self.tick)
+            with self._lock:
+                for condition in self._conditions.values():
+                    condition.notify_all()
+
+    def publish(self, resource, revision, event_type, obj, old=None):
+        condition = self._condition(resource)
+        with condition:
+            self.revision = revision
+            history = self._histories.get(resource)
+            if history is None:
+                history = self._histories[resource] = deque(
+                    maxlen=self.history_size)
+            if len(history) == history.maxlen:
+                self._compacted[resource] = history[0].revision
+            history.append(Event(revision, event_type, obj, old))
+            condition.notify_all()
+
+    def compact(self, resource, revision):
+        with self._lock:
+            self._compacted[resource] = max(
+                revision, self._compacted.get(resource, 0))
+
+    def reset(self, revision):
+        with self._lock:
+            self._histories.clear()
+            self._compacted = dict.fromkeys(self._compacted, revision)
+            self._floor = revision
+            self.generation += 1
+            for condition in self._conditions.values():
+                condition.notify_all()
+
+    def since(self, resource, revision):
+        with self._lock:
+            return self._since(resource, revision)
+
+    def _since(self, resource, revision):
+        compacted = max(self._compacted.get(resource, 0), self._floor)
+        if revision < compacted:
+            raise Expired('too old resource version: %d (%d)' %
+                          (revision, compacted))
+        events = []
+        for event in reversed(self._histories.get(resource, ())):
+            if event.revision <= revision:
+                break
+            events.append(event)
+        events.reverse()
+        return events
+
+    def follow(self, resource, revision, timeout):
+        deadline = time.time() + timeout
+        condition = self._condition(resource)
+        while True:
+            with condition:
+                self._start_ticker()
+                events = self._since(resource, revision)
+                while not events:
+                    if time.time() >= deadline:
+                        return
+                    condition.wait()
+                    events = self._since(resource, revision)
+            revision = events[-1].revision
+            for event in events:
+                yield event
+
+
+def stream(objects, events, selectors=()):
+    def match(obj):
+        return all(selector(obj) for selector in selectors)
+
+    for obj in objects:
+        yield ADDED, obj
+    try:
+        for event in events:
+            if event.type != MODIFIED:
+                if match(event.obj):
+                    yield event.type, event.obj
+                continue
+            matched, was_matched = match(event.obj), match(event.old)
+            if matched and was_matched:
+                yield MODIFIED, event.obj
+            elif matched:
+                yield ADDED, event.obj
+            elif was_matched:
+                yield DELETED, event.obj
+    except Expired as e:
+        yield ERROR, {
+            'apiVersion': 'v1',
+            'kind': 'Status',
+            'code': 410,
+            'reason': 'Expired',
+            'message': str(e),
+            'status': 'Failure'
+        }
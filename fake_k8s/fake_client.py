@@ -1,16 +1,25 @@
 # coding=UTF-8
-import re
+import base64
 import json
-import os
+import events
 import fake_objects
+import store
 import utils
-from fake_resources import FakeResources
-from functools import wraps
+from fake_resources import RESOURCE_KINDS
+from fake_objects import STORE
 from flask import current_app as app
-from flask_cache import Cache
+from functools import wraps
+
+
+def gen_resources(resource_kinds):
+    resources = {}
+    for target, (kind, namespaced) in resource_kinds.iteritems():
+        obj_class = getattr(fake_objects, kind, fake_objects.FakeObject)
+        resources[target] = (kind, obj_class.namespaced, obj_class)
+    return resources
 
 
-CACHE = Cache(app, config=app.config['CACHE_CONFIG'])
+RESOURCES = gen_resources(RESOURCE_KINDS)
 
 
 def failure_content(status_code, reason, message):
@@ -25,20 +34,31 @@ def failure_content(status_code, reason, message):
     return content
 
 
+def namespace_exists(namespace):
+    return STORE.get('namespaces', None, namespace) is not None
+
+
+def encode_continue(revision, start):
+    return base64.urlsafe_b64encode(json.dumps({'rv': revision,
+                                                'start': list(start)}))
+
+
+def decode_continue(token):
+    try:
+        token = json.loads(base64.urlsafe_b64decode(str(token)))
+        return int(token['rv']), tuple(token['start'])
+    except (TypeError, ValueError, KeyError):
+        raise ValueError('continue key is not valid')
+
+
 class ObjectOperator(object):
     def __init__(self, target_name, target_namespace,
                  targets, key, content={}):
-        kind = 'None'
-        fake_resources = FakeResources()
-        resource_list = fake_resources.get(os.path.join(targets['base'],
-                                           targets['version']), targets)
-        for resource in resource_list['response']['resources']:
-            if resource['name'] == key:
-                kind = resource['kind']
-        obj_class = getattr(fake_objects, kind,
-                            fake_objects.FakeObject)
+        kind, namespaced, obj_class = RESOURCES.get(
+            (targets['base'], targets['version'], key),
+            ('None', False, fake_objects.FakeObject))
         name = target_name or content.get('metadata', {}).get('name')
-        if target_namespace is None or not obj_class.namespaced:
+        if target_namespace is None or not namespaced:
             namespace = None
         else:
             namespace = (target_namespace or
@@ -50,31 +70,10 @@ class ObjectOperator(object):
         self.targets = targets
 
     def label_filter(self, label_selectors):
-        label_pattern = \
-            '((?:\\b\S+ (?:in|notin) \([^\)]*\))|(?:!?\\b[^,]+\\b))'
-        labels_list = re.findall(label_pattern, label_selectors)
-        selectors = []
-        for label in labels_list:
-            for selector in utils.labelSelectors:
-                selector_inst = selector(label)
-                if selector_inst.is_available:
-                    selectors.append(selector_inst)
-                    break
-            else:
-                raise Exception("Unable to parse selector '%s'" % label)
-        return selectors
+        return list(utils.parse_label_selector(label_selectors))
 
     def field_filter(self, field_selectors):
-        field_pattern = '(\\b[^,]+\\b)'
-        fields_list = re.findall(field_pattern, field_selectors)
-        selectors = []
-        for field in fields_list:
-            selector_inst = utils.fieldSelector(field)
-            if selector_inst.is_available:
-                selectors.append(selector_inst)
-            else:
-                raise Exception("Unable to parse selector '%s'" % field)
-        return selectors
+        return list(utils.parse_field_selector(field_selectors))
 
     def ns_filter(self, namespace):
         if namespace and self.obj.namespaced:
@@ -86,11 +85,7 @@ class ObjectOperator(object):
         @wraps(func)
         def wrap(self, *args, **kwargs):
             if self.obj.namespaced and self.obj.namespace is not None:
-                namespaces = CACHE.get('namespaces') or []
-                for ns in namespaces:
-                    if ns['metadata']['name'] == self.obj.namespace:
-                        break
-                else:
+                if not namespace_exists(self.obj.namespace):
                     return failure_content(
                         404, 'NotFound',
                         'namespaces "%s" not found' % self.obj.namespace)
@@ -111,6 +106,15 @@ class ObjectOperator(object):
                         404, 'NotFound',
                         '%s "%s" not found' % (self.key, self.obj.name))
                 return ret
+            except store.AlreadyExists as e:
+                return failure_content(409, 'AlreadyExists', str(e))
+            except store.Conflict as e:
+                return failure_content(
+                    409, 'Conflict',
+                    'Operation cannot be fulfilled on %s "%s": %s' %
+                    (self.key, self.obj.name, e))
+            except events.Expired as e:
+                return failure_content(410, 'Expired', str(e))
             except Exception as e:
                 return failure_content(
                     500, 'InternalServerError', str(e))
@@ -126,14 +130,75 @@ class ObjectOperator(object):
 
     @request_handler
     def get(self, **kwargs):
+        revision = int(kwargs.get('resourceVersion') or 0)
+        if revision > STORE.revision:
+            return failure_content(
+                504, 'Timeout', 'Too large resource version: %d, '
+                'current: %d' % (revision, STORE.revision))
         if self.obj.name:
             return self.obj.get()
-        objects = CACHE.get(self.key) or []
+        if int(kwargs.get('limit') or 0) > 0 or kwargs.get('continue'):
+            return self.get_page(**kwargs)
         filters = self.ns_filter(self.obj.namespace)
         filters.extend(self.label_filter(kwargs.get('labelSelector', '')))
         filters.extend(self.field_filter(kwargs.get('fieldSelector', '')))
-        return {'items': filter(lambda obj: all(f(obj) for f in filters),
-                objects), 'kind': '%sList' % self.obj.kind, "apiVersion": "v1"}
+        if kwargs.get('resourceVersionMatch') == 'Exact' and revision:
+            revision, items = STORE.snapshot(self.key, filters, revision)
+        else:
+            revision, items = STORE.snapshot(self.key, filters)
+        return {'items': items, 'kind': '%sList' % self.obj.kind,
+                "apiVersion": "v1",
+                'metadata': {'resourceVersion': str(revision)}}
+
+    def get_page(self, **kwargs):
+        filters = self.label_filter(kwargs.get('labelSelector', ''))
+        filters.extend(self.field_filter(kwargs.get('fieldSelector', '')))
+        namespace = self.obj.namespace if self.obj.namespaced else None
+        revision, start = None, None
+        if kwargs.get('continue'):
+            if kwargs.get('resourceVersion'):
+                return failure_content(
+                    400, 'BadRequest', 'specifying resource version is not '
+                    'allowed when using continue')
+            try:
+                revision, start = decode_continue(kwargs['continue'])
+            except ValueError as e:
+                return failure_content(400, 'BadRequest', str(e))
+        elif kwargs.get('resourceVersionMatch') == 'Exact':
+            revision = int(kwargs.get('resourceVersion') or 0) or None
+        try:
+            revision, items, last, remaining = STORE.page(
+                self.key, filters, int(kwargs.get('limit') or 0) or None,
+                start, revision, namespace)
+        except events.Expired:
+            if start is None:
+                raise
+            return failure_content(
+                410, 'Expired', 'The provided continue parameter is too old '
+                'to display a consistent list result. You can start a new '
+                'list without the continue parameter.')
+        metadata = {'resourceVersion': str(revision)}
+        if last is not None:
+            metadata['continue'] = encode_continue(revision, last)
+        if remaining is not None:
+            metadata['remainingItemCount'] = remaining
+        return {'items': items, 'kind': '%sList' % self.obj.kind,
+                "apiVersion": "v1", 'metadata': metadata}
+
+    @request_handler
+    def watch(self, **kwargs):
+        filters = self.ns_filter(self.obj.namespace)
+        filters.extend(self.label_filter(kwargs.get('labelSelector', '')))
+        filters.extend(self.field_filter(kwargs.get('fieldSelector', '')))
+        if self.obj.name:
+            filters.append(utils.fieldSelector(
+                'metadata.name=%s' % self.obj.name))
+        timeout = int(kwargs.get('timeoutSeconds') or
+                      app.config['WATCH_TIMEOUT'])
+        revision = int(kwargs.get('resourceVersion') or 0) or None
+        stream = STORE.watch(self.key, filters, timeout, revision)
+        return {'stream': (json.dumps({'type': event_type, 'object': obj}) +
+                           '\n' for event_type, obj in stream)}
 
     @request_handler
     def update(self, **kwargs):
@@ -204,7 +269,10 @@ class FakeRequest(object):
     def get(self, target_name, target_namespace, key, api_targets, **kwargs):
         obj_op = ObjectOperator(target_name, target_namespace,
                                 api_targets, key)
-        output = obj_op.get(**kwargs)
+        if kwargs.get('watch') in ['true', '1']:
+            output = obj_op.watch(**kwargs)
+        else:
+            output = obj_op.get(**kwargs)
         return {'code': output.get('code', 200), 'response': output}
 
     @get_api_targets
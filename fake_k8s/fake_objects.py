@@ -1,16 +1,21 @@
 # coding=UTF-8
 # flake8: noqa
-import ast
 import copy
 import random
 import string
+from ast import literal_eval
 from datetime import datetime
 from flask import current_app as app
-from flask_cache import Cache
+import scheduler
+import store
 import utils
 
 
-CACHE = Cache(app, config=app.config['CACHE_CONFIG'])
+STORE = store.create_store(app.config['STORE_CONFIG'],
+                           app.config['CACHE_CONFIG'])
+SCHEDULER = scheduler.Scheduler.from_config(STORE,
+                                            app.config['SCHEDULER_CONFIG'])
+RENDER_MODE = app.config['RENDER_MODE']
 
 
 def gen_child_name(name, size=5, chars=string.ascii_lowercase + string.digits):
@@ -29,33 +34,60 @@ class FakeObject(object):
         self.key = key
         self.content = content
 
+    @classmethod
+    def get_template(cls):
+        return utils.get_template('%s.%s' % (cls.__module__, cls.__name__),
+                                  cls.template)
+
     def render_template(self, **extra_prop):
-        env = utils.JinjaEnvironment()
-        tmpl = env.from_string(self.template)
-        extra_prop['current_time'] = datetime.utcnow()
+        tmpl = self.get_template()
         return tmpl.render(extra_prop).strip()
 
+    def build_metadata(self, obj, current_time, owner_references=False):
+        metadata = obj['metadata']
+        built = {
+            'creationTimestamp': utils.datetime(current_time),
+            'name': metadata.get('name', ''),
+            'labels': utils.clone(metadata.get('labels') or {}),
+            'annotations': utils.clone(metadata.get('annotations') or {})
+        }
+        if self.namespaced:
+            built['namespace'] = metadata.get('namespace') or 'default'
+        if owner_references and 'ownerReferences' in metadata:
+            built['ownerReferences'] = utils.clone(metadata['ownerReferences'])
+        return built
+
+    def render(self, obj, **extra_prop):
+        extra_prop['current_time'] = datetime.utcnow()
+        if RENDER_MODE == 'builder' and hasattr(self, 'build'):
+            return self.build(obj, **extra_prop)
+        elif self.template:
+            extra_prop['obj'] = obj
+            return literal_eval(self.render_template(**extra_prop))
+        return obj
+
     def get(self):
-        objects = CACHE.get(self.key) or []
-        for obj in objects:
-            if (obj['kind'] == self.kind and
-                    obj['metadata']['name'] == self.name and
-                    obj['metadata'].get('namespace') == self.namespace):
-                return obj
+        obj = STORE.get(self.key, self.namespace, self.name)
+        if obj and obj['kind'] == self.kind:
+            return obj
         return {}
 
     def create(self, **extra_prop):
-        objects = CACHE.get(self.key) or []
-        if self.template:
-            extra_prop['obj'] = self.content
-            rendered_template = self.render_template(**extra_prop)
-            content = ast.literal_eval(rendered_template)
-        else:
-            content = self.content
-        objects.append(content)
-        CACHE.set(self.key, objects)
+        content = self.render(self.content, **extra_prop)
+        STORE.create(self.key, content)
         return content
 
+    @classmethod
+    def render_many(cls, objs, **extra_prop):
+        return [obj.render(obj.content, **extra_prop) for obj in objs]
+
+    @classmethod
+    def create_many(cls, objs, **extra_prop):
+        contents = cls.render_many(objs, **extra_prop)
+        if contents:
+            STORE.create_many(objs[0].key, contents)
+        return contents
+
     def __partial_update(self, obj, value):
         for k, v in value.iteritems():
             if isinstance(obj.get(k), dict):
@@ -65,60 +97,42 @@ class FakeObject(object):
             else:
                 obj[k] = v
 
+    def __compare_and_set(self, build):
+        resource_version = \
+            self.content.get('metadata', {}).get('resourceVersion')
+        while True:
+            obj = STORE.get(self.key, self.namespace, self.name)
+            if not obj:
+                return {}
+            content = build(obj)
+            stored = dict(obj)
+            stored.update(content)
+            try:
+                STORE.update(self.key, self.namespace, self.name, stored,
+                             resource_version or
+                             obj['metadata'].get('resourceVersion'))
+            except store.Conflict:
+                if resource_version:
+                    raise
+                continue
+            return content
+
     def update(self, **extra_prop):
-        content = {}
-        objects = CACHE.get(self.key) or []
-        for obj in objects:
-            if obj['metadata']['name'] == self.name and \
-                    obj['metadata'].get('namespace') == self.namespace:
-                content = copy.deepcopy(obj)
-                self.__partial_update(content, self.content)
-                if self.template:
-                    extra_prop['obj'] = content
-                    rendered_template = self.render_template(**extra_prop)
-                    content = ast.literal_eval(rendered_template)
-                obj.update(content)
-                break
-        CACHE.set(self.key, objects)
-        return content
+        def build(obj):
+            content = copy.deepcopy(obj)
+            self.__partial_update(content, self.content)
+            return self.render(content, **extra_prop)
+        return self.__compare_and_set(build)
 
     def replace(self, **extra_prop):
-        content = {}
-        objects = CACHE.get(self.key) or []
-        for obj in objects:
-            if obj['metadata']['name'] == self.name and \
-                    obj['metadata'].get('namespace') == self.namespace:
-                if self.template:
-                    extra_prop['obj'] = self.content
-                    rendered_template = self.render_template(**extra_prop)
-                    content = ast.literal_eval(rendered_template)
-                else:
-                    content = self.content
-                obj.update(content)
-                break
-        CACHE.set(self.key, objects)
-        return content
+        return self.__compare_and_set(
+            lambda obj: self.render(self.content, **extra_prop))
 
     def delete(self):
-        content = {}
-        objects = CACHE.get(self.key) or []
-        for index, obj in enumerate(objects):
-            if obj['metadata']['name'] == self.name and \
-                    obj['metadata'].get('namespace') == self.namespace:
-                content = objects.pop(index)
-                break
-        CACHE.set(self.key, objects)
-        return content
+        return STORE.delete(self.key, self.namespace, self.name) or {}
 
     def get_objects_by_references(self, key):
-        objects = CACHE.get(key) or []
-        ret = []
-        for obj in objects:
-            refs = obj['metadata'].get('ownerReferences', [])
-            for ref in refs:
-                if ref['kind'] == self.kind and ref['name'] == self.name:
-                    ret.append(obj)
-        return ret
+        return STORE.query(key, [utils.OwnerSelector(self.kind, self.name)])
 
 
 class Node(FakeObject):
@@ -204,6 +218,73 @@ class Node(FakeObject):
       }
     '''
 
+    def build(self, obj, current_time, **extra_prop):
+        metadata = obj['metadata']
+        name = metadata.get('name', '')
+        labels = {
+            'beta.kubernetes.io/arch': 'amd64',
+            'beta.kubernetes.io/os': 'linux'
+        }
+        labels.update(utils.clone(metadata.get('labels') or {}))
+        labels['kubernetes.io/hostname'] = name
+        spec = {
+            'externalID': name,
+            'podCIDR': '127.0.0.0/24'
+        }
+        if (obj.get('spec') or {}).get('unschedulable'):
+            spec['unschedulable'] = True
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'Node',
+            'metadata': {
+                'name': name,
+                'labels': labels,
+                'annotations': utils.clone(metadata.get('annotations') or {})
+            },
+            'spec': spec,
+            'status': {
+                'addresses': [
+                    {'address': '127.0.0.1', 'type': 'InternalIP'},
+                    {'address': name, 'type': 'Hostname'}
+                ],
+                'allocatable': {
+                    'alpha.kubernetes.io/nvidia-gpu': '0',
+                    'cpu': '8',
+                    'ephemeral-storage': '107374182400',
+                    'hugepages-2Mi': '0',
+                    'memory': '16777216Ki',
+                    'pods': '110'
+                },
+                'capacity': {
+                    'alpha.kubernetes.io/nvidia-gpu': '0',
+                    'cpu': '8',
+                    'ephemeral-storage': '104857600Ki',
+                    'hugepages-2Mi': '0',
+                    'memory': '16777216Ki',
+                    'pods': '110'
+                },
+                'conditions': [{
+                    'message': 'kubelet is posting ready status',
+                    'reason': 'KubeletReady',
+                    'status': 'True',
+                    'type': 'Ready'
+                }],
+                'images': [],
+                'nodeInfo': {
+                    'architecture': 'amd64',
+                    'bootID': 'f391568e-1adb-4b09-bcf1-bd4a4656e241',
+                    'containerRuntimeVersion': 'docker://18.6.1',
+                    'kernelVersion': '4.4.0-101-generic',
+                    'kubeProxyVersion': 'v1.10.4',
+                    'kubeletVersion': 'v1.10.4',
+                    'machineID': '66f3f4cf26c749d29b2d23ca6d229664',
+                    'operatingSystem': 'linux',
+                    'osImage': 'Ubuntu 16.04.3 LTS',
+                    'systemUUID': '205FC311-D1E4-4C77-6FD4-9D041AC3070F'
+                }
+            }
+        }
+
     def update(self):
         spec = self.content.get('spec', {})
         if spec.get('unschedulable') is not True:
@@ -228,6 +309,16 @@ class Namespace(FakeObject):
       }
     '''
 
+    def build(self, obj, current_time, **extra_prop):
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'Namespace',
+            'metadata': self.build_metadata(obj, current_time),
+            'status': {
+                'phase': 'Active'
+            }
+        }
+
 
 class Pod(FakeObject):
     namespaced = True
@@ -337,38 +428,114 @@ class Pod(FakeObject):
       }
     '''
 
-    def __pod_scheduler(self):
-        nodes = CACHE.get('nodes') or []
-        spec = self.content['spec']
-        scheduled_node = None
-        if 'nodeName' in spec:
-            for node in nodes:
-                if node['metadata']['name'] == spec['nodeName']:
-                    scheduled_node = node
-                    break
+    def build(self, obj, current_time, node=None, status=None,
+              **extra_prop):
+        metadata = obj['metadata']
+        if not status:
+            if 'phase' in (obj.get('status') or {}):
+                status = obj['status']['phase']
+            elif 'ownerReferences' in metadata and \
+                    metadata['ownerReferences'][0]['kind'] == 'Job':
+                status = 'Succeeded'
+            else:
+                status = 'Running'
+        node_name = node['metadata']['name'] if node else \
+            obj['spec'].get('nodeName')
+        timestamp = utils.datetime(current_time)
+        spec = {}
+        for key, value in obj['spec'].iteritems():
+            if key == 'containers':
+                spec['containers'] = [{
+                    'image': container.get('image', ''),
+                    'name': container.get('name', ''),
+                    'ports': [self.__build_port(port)
+                              for port in container.get('ports') or []],
+                    'resources': utils.clone(
+                        container.get('resources') or {}),
+                    'volumeMounts': utils.clone(
+                        container.get('volumeMounts') or [])
+                } for container in value]
+            else:
+                spec[key] = utils.clone(value)
+        if node_name:
+            spec['nodeName'] = node_name
+        pod_status = {'phase': status}
+        if status != 'Pending':
+            pod_status.update({
+                'conditions': [{
+                    'lastProbeTime': None,
+                    'lastTransitionTime': timestamp,
+                    'status': 'True',
+                    'type': condition_type
+                } for condition_type in ['Initialized', 'Ready',
+                                         'PodScheduled']],
+                'containerStatuses': [
+                    self.__build_container_status(container, status,
+                                                  timestamp)
+                    for container in obj['spec'].get('containers', [])],
+                'hostIP': '127.0.0.1',
+                'podIP': '127.0.0.1',
+                'startTime': timestamp
+            })
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'Pod',
+            'metadata': self.build_metadata(obj, current_time,
+                                            owner_references=True),
+            'spec': spec,
+            'status': pod_status
+        }
+
+    def __build_port(self, port):
+        built = {
+            'containerPort': port['containerPort'],
+            'protocol': port.get('protocol') or 'TCP'
+        }
+        if 'name' in port:
+            built['name'] = port['name']
+        return built
+
+    def __build_container_status(self, container, status, timestamp):
+        container_status = {
+            'containerID': 'docker://%s' % utils.random_string(12),
+            'image': container.get('image', ''),
+            'name': container.get('name', ''),
+            'restartCount': 0
+        }
+        if status == 'Succeeded':
+            container_status.update({
+                'ready': False,
+                'state': {
+                    'terminated': {
+                        'startedAt': timestamp,
+                        'finishedAt': timestamp,
+                        'reason': 'Completed'
+                    }
+                }
+            })
         else:
-            selectors = utils.as_selectors(spec.get('nodeSelector', {}))
-            nodeSelectors = spec.get('affinity', {}).get(
-                'nodeAffinity', {}
-            ).get(
-                'requiredDuringSchedulingIgnoredDuringExecution', {}
-            ).get('nodeSelectorTerms', [])
-            for nodeSelector in nodeSelectors:
-                selectors.extend(utils.as_selectors(nodeSelector.get(
-                    'matchExpressions', [])))
-            match_nodes = filter(
-                lambda node: all(selector(node) for selector in selectors),
-                nodes)
-            if match_nodes:
-                scheduled_node = random.choice(match_nodes)
-            elif not selectors and nodes:
-                scheduled_node = random.choice(nodes)
-        return scheduled_node
+            container_status.update({
+                'ready': True,
+                'state': {
+                    'running': {
+                        'startedAt': timestamp
+                    }
+                }
+            })
+        return container_status
 
     def create(self):
-        node = self.__pod_scheduler()
-        status = 'Pending' if not node else None
-        return super(Pod, self).create(node=node, status=status)
+        return self.create_many([self])[0]
+
+    @classmethod
+    def render_many(cls, objs, placement=None):
+        placement = placement or SCHEDULER.placement()
+        contents = []
+        for obj in objs:
+            node = placement(obj.content)
+            status = 'Pending' if not node else None
+            contents.append(obj.render(obj.content, node=node, status=status))
+        return contents
 
     def log(self, **kwargs):
         return {'content': 'This is the log message from the fake client'}
@@ -424,7 +591,38 @@ class ReplicationController(FakeObject):
       }
     '''
 
+    def build(self, obj, current_time, **extra_prop):
+        spec = obj['spec']
+        replicas = spec['replicas'] if 'replicas' in spec else 1
+        template_metadata = spec['template']['metadata']
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'ReplicationController',
+            'metadata': self.build_metadata(obj, current_time),
+            'spec': {
+                'replicas': replicas,
+                'selector': utils.clone(template_metadata['labels']),
+                'template': {
+                    'metadata': {
+                        'labels': utils.clone(
+                            template_metadata.get('labels') or {}),
+                        'annotations': utils.clone(
+                            template_metadata.get('annotations') or {})
+                    },
+                    'spec': utils.clone(spec['template']['spec'])
+                }
+            },
+            'status': {
+                'availableReplicas': replicas,
+                'fullyLabeledReplicas': replicas,
+                'observedGeneration': replicas,
+                'readyReplicas': replicas,
+                'replicas': replicas
+            }
+        }
+
     def __create_child_pods(self, template, replicas):
+        pods = []
         for replica in xrange(replicas):
             pod_template = copy.deepcopy(template['spec']['template'])
             pod_template.update({'apiVersion': 'v1', 'kind': 'Pod'})
@@ -437,11 +635,11 @@ class ReplicationController(FakeObject):
                     'name': self.name
                 }]
             })
-            pod_obj = Pod(pod_template['kind'],
-                          pod_template['metadata']['name'],
-                          pod_template['metadata']['namespace'],
-                          'pods', pod_template)
-            pod_obj.create()
+            pods.append(Pod(pod_template['kind'],
+                            pod_template['metadata']['name'],
+                            pod_template['metadata']['namespace'],
+                            'pods', pod_template))
+        Pod.create_many(pods)
 
     def create(self):
         obj = super(ReplicationController, self).create()
@@ -525,6 +723,45 @@ class Service(FakeObject):
       }
     '''
 
+    def build(self, obj, current_time, **extra_prop):
+        spec = obj['spec']
+        ports = []
+        for port in spec.get('ports') or []:
+            built_port = {
+                'port': port['port'],
+                'protocol': port.get('protocol') or 'TCP',
+                'targetPort': port.get('targetPort') or port['port']
+            }
+            if 'name' in port:
+                built_port['name'] = port['name']
+            if spec.get('type') in ['LoadBalancer', 'NodePort']:
+                built_port['nodePort'] = port['nodePort'] \
+                    if 'nodePort' in port \
+                    else int('3%s' % utils.random_number(4))
+            ports.append(built_port)
+        built_spec = {
+            'ports': ports,
+            'selector': utils.clone(spec.get('selector')),
+            'type': spec.get('type') or 'ClusterIP',
+            'clusterIP': '127.0.0.1',
+            'externalTrafficPolicy': 'Cluster',
+            'sessionAffinity': 'None'
+        }
+        if 'externalIPs' in spec:
+            built_spec['externalIPs'] = utils.clone(spec['externalIPs'])
+        load_balancer = {}
+        if spec.get('type') == 'LoadBalancer':
+            load_balancer['ingress'] = [{'ip': '127.0.0.1'}]
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'Service',
+            'metadata': self.build_metadata(obj, current_time),
+            'spec': built_spec,
+            'status': {
+                'loadBalancer': load_balancer
+            }
+        }
+
 
 class NetworkPolicy(FakeObject):
     namespaced = True
@@ -559,6 +796,28 @@ class NetworkPolicy(FakeObject):
       }
     '''
 
+    def build(self, obj, current_time, **extra_prop):
+        spec = obj['spec']
+        policy_types = spec.get('policyTypes') or []
+        built_spec = {
+            'podSelector': utils.clone(spec.get('podSelector')),
+            'policyTypes': []
+        }
+        for key in ['ingress', 'egress']:
+            if key in spec:
+                built_spec[key] = utils.clone(spec[key])
+        if spec.get('ingress') or 'Ingress' in policy_types or \
+                not policy_types:
+            built_spec['policyTypes'].append('Ingress')
+        if spec.get('egress') or 'Egress' in policy_types:
+            built_spec['policyTypes'].append('Egress')
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'NetworkPolicy',
+            'metadata': self.build_metadata(obj, current_time),
+            'spec': built_spec
+        }
+
 
 class Job(FakeObject):
     namespaced = True
@@ -622,7 +881,54 @@ class Job(FakeObject):
       }
     '''
 
+    def build(self, obj, current_time, **extra_prop):
+        spec = obj['spec']
+        name = obj['metadata'].get('name', '')
+        parallelism = spec.get('parallelism') or 1
+        completions = spec.get('completions') or parallelism
+        template_metadata = spec['template']['metadata']
+        labels = utils.clone(template_metadata.get('labels') or {})
+        labels['job-name'] = name
+        timestamp = utils.datetime(current_time)
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'Job',
+            'metadata': self.build_metadata(obj, current_time,
+                                            owner_references=True),
+            'spec': {
+                'backoffLimit': spec['backoffLimit']
+                if 'backoffLimit' in spec else 6,
+                'parallelism': parallelism,
+                'completions': completions,
+                'selector': {
+                    'matchLabels': {
+                        'job-name': name
+                    }
+                },
+                'template': {
+                    'metadata': {
+                        'labels': labels,
+                        'annotations': utils.clone(
+                            template_metadata.get('annotations') or {})
+                    },
+                    'spec': utils.clone(spec['template']['spec'])
+                }
+            },
+            'status': {
+                'conditions': [{
+                    'lastProbeTime': timestamp,
+                    'lastTransitionTime': timestamp,
+                    'status': 'True',
+                    'type': 'Complete'
+                }],
+                'completionTime': timestamp,
+                'startTime': timestamp,
+                'succeeded': completions
+            }
+        }
+
     def __create_child_pods(self, template, completions):
+        pods = []
         for completion in xrange(completions):
             pod_template = copy.deepcopy(template['spec']['template'])
             pod_template.update({'apiVersion': 'v1', 'kind': 'Pod'})
@@ -635,11 +941,11 @@ class Job(FakeObject):
                     'name': self.name
                 }]
             })
-            pod_obj = Pod(pod_template['kind'],
-                          pod_template['metadata']['name'],
-                          pod_template['metadata']['namespace'],
-                          'pods', pod_template)
-            pod_obj.create()
+            pods.append(Pod(pod_template['kind'],
+                            pod_template['metadata']['name'],
+                            pod_template['metadata']['namespace'],
+                            'pods', pod_template))
+        Pod.create_many(pods)
 
     def create(self):
         obj = super(Job, self).create()
@@ -689,6 +995,31 @@ class CronJob(FakeObject):
       }
     '''
 
+    def build(self, obj, current_time, **extra_prop):
+        spec = obj['spec']
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'CronJob',
+            'metadata': self.build_metadata(obj, current_time),
+            'spec': {
+                'concurrencyPolicy': spec.get('concurrencyPolicy') or 'Allow',
+                'schedule': spec.get('schedule', ''),
+                'jobTemplate': {
+                    'metadata': utils.clone(
+                        spec['jobTemplate'].get('metadata') or {}),
+                    'spec': utils.clone(spec['jobTemplate']['spec'])
+                },
+                'failedJobsHistoryLimit':
+                    spec.get('failedJobsHistoryLimit') or 1,
+                'successfulJobsHistoryLimit':
+                    spec.get('successfulJobsHistoryLimit') or 3,
+                'suspend': spec.get('suspend') or False
+            },
+            'status': {
+                'lastScheduleTime': utils.datetime(current_time)
+            }
+        }
+
     def __create_child_job(self, template):
         job_template = copy.deepcopy(template['spec']['jobTemplate'])
         job_template.update({'apiVersion': 'batch/v1', 'kind': 'Job'})
@@ -751,6 +1082,19 @@ class Ingress(FakeObject):
       }
     '''
 
+    def build(self, obj, current_time, **extra_prop):
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'Ingress',
+            'metadata': self.build_metadata(obj, current_time),
+            'spec': utils.clone(obj['spec']),
+            'status': {
+                'loadBalancer': {
+                    'ingress': [{'ip': '127.0.0.1'}]
+                }
+            }
+        }
+
 
 class Secret(FakeObject):
     namespaced = True
@@ -770,6 +1114,15 @@ class Secret(FakeObject):
       }
     '''
 
+    def build(self, obj, current_time, **extra_prop):
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'Secret',
+            'metadata': self.build_metadata(obj, current_time),
+            'type': obj.get('type', ''),
+            'data': utils.clone(obj.get('data'))
+        }
+
 
 class PersistentVolumeClaim(FakeObject):
     namespaced = True
@@ -795,9 +1148,24 @@ class PersistentVolumeClaim(FakeObject):
       }
     '''
 
+    def build(self, obj, current_time, bind_pv=None, **extra_prop):
+        status = {'phase': 'Bound' if bind_pv else 'Pending'}
+        if bind_pv:
+            status.update({
+                'accessModes': utils.clone(bind_pv['spec']['accessModes']),
+                'capacity': utils.clone(bind_pv['spec']['capacity'])
+            })
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'PersistentVolumeClaim',
+            'metadata': self.build_metadata(obj, current_time),
+            'spec': utils.clone(obj['spec']),
+            'status': status
+        }
+
     def __get_bind_pv(self):
         bind_pv = None
-        pvs = CACHE.get('persistentvolumes') or []
+        pvs = STORE.list('persistentvolumes')
         spec = self.content['spec']
         for pv in pvs:
             if pv['status']['phase'] != 'Available':
@@ -838,7 +1206,7 @@ class PersistentVolumeClaim(FakeObject):
     def delete(self):
         obj = super(PersistentVolumeClaim, self).delete()
         if obj and obj['status']['phase'] == 'Bound':
-            pvs = CACHE.get('persistentvolumes') or []
+            pvs = STORE.list('persistentvolumes')
             for pv in pvs:
                 claimRef = pv['spec'].get('claimRef')
                 if claimRef and claimRef['kind'] == self.kind and \
@@ -884,8 +1252,23 @@ class PersistentVolume(FakeObject):
       }
     '''
 
+    def build(self, obj, current_time, status=None, **extra_prop):
+        spec = {}
+        if not obj['spec'].get('persistentVolumeReclaimPolicy'):
+            spec['persistentVolumeReclaimPolicy'] = 'Retain'
+        spec.update(utils.clone(obj['spec']))
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'PersistentVolume',
+            'metadata': self.build_metadata(obj, current_time),
+            'spec': spec,
+            'status': {
+                'phase': status or 'Available'
+            }
+        }
+
     def __get_reference_claims(self):
-        pvcs = CACHE.get('persistentvolumeclaims') or []
+        pvcs = STORE.list('persistentvolumeclaims')
         claims = []
         for pvc in pvcs:
             if pvc['spec'].get('volumeName') == self.name:
@@ -977,7 +1360,41 @@ class ReplicaSet(FakeObject):
       }
     '''
 
+    def build(self, obj, current_time, **extra_prop):
+        spec = obj['spec']
+        replicas = spec['replicas'] if 'replicas' in spec else 1
+        template_metadata = spec['template']['metadata']
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'ReplicaSet',
+            'metadata': self.build_metadata(obj, current_time,
+                                            owner_references=True),
+            'spec': {
+                'replicas': replicas,
+                'selector': {
+                    'matchLabels': utils.clone(template_metadata['labels'])
+                },
+                'template': {
+                    'metadata': {
+                        'labels': utils.clone(
+                            template_metadata.get('labels') or {}),
+                        'annotations': utils.clone(
+                            template_metadata.get('annotations') or {})
+                    },
+                    'spec': utils.clone(spec['template']['spec'])
+                }
+            },
+            'status': {
+                'availableReplicas': replicas,
+                'fullyLabeledReplicas': replicas,
+                'observedGeneration': replicas,
+                'readyReplicas': replicas,
+                'replicas': replicas
+            }
+        }
+
     def __create_child_pods(self, template, replicas):
+        pods = []
         for replica in xrange(replicas):
             pod_template = copy.deepcopy(template['spec']['template'])
             pod_template.update({'apiVersion': 'v1', 'kind': 'Pod'})
@@ -990,11 +1407,11 @@ class ReplicaSet(FakeObject):
                     'name': self.name
                 }]
             })
-            pod_obj = Pod(pod_template['kind'],
-                          pod_template['metadata']['name'],
-                          pod_template['metadata']['namespace'],
-                          'pods', pod_template)
-            pod_obj.create()
+            pods.append(Pod(pod_template['kind'],
+                            pod_template['metadata']['name'],
+                            pod_template['metadata']['namespace'],
+                            'pods', pod_template))
+        Pod.create_many(pods)
 
     def create(self):
         obj = super(ReplicaSet, self).create()
@@ -1100,6 +1517,67 @@ class Deployment(FakeObject):
       }
     '''
 
+    def build(self, obj, current_time, **extra_prop):
+        spec = obj['spec']
+        replicas = spec['replicas'] if 'replicas' in spec else 1
+        revision_key = 'deployment.kubernetes.io/revision'
+        annotations = obj['metadata']['annotations']
+        revision = int(annotations.get(revision_key) or '0')
+        metadata = self.build_metadata(obj, current_time)
+        metadata['annotations'] = dict(
+            (key, utils.clone(value)) for key, value in annotations.items()
+            if key != revision_key)
+        metadata['annotations'][revision_key] = str(revision + 1)
+        built_spec = {
+            'progressDeadlineSeconds':
+                spec.get('progressDeadlineSeconds') or 600,
+            'revisionHistoryLimit': spec.get('revisionHistoryLimit') or 10,
+            'replicas': replicas,
+            'selector': {
+                'matchLabels': utils.clone(
+                    spec['template']['metadata']['labels'])
+            },
+            'strategy': self.__build_strategy(spec.get('strategy') or {}),
+            'template': {
+                'metadata': {
+                    'labels': utils.clone(
+                        spec['template']['metadata'].get('labels') or {}),
+                    'annotations': utils.clone(
+                        spec['template']['metadata'].get('annotations') or
+                        {})
+                },
+                'spec': utils.clone(spec['template']['spec'])
+            }
+        }
+        if 'minReadySeconds' in spec:
+            built_spec['minReadySeconds'] = spec['minReadySeconds']
+        if spec.get('paused'):
+            built_spec['paused'] = True
+        return {
+            'apiVersion': obj.get('apiVersion', ''),
+            'kind': 'Deployment',
+            'metadata': metadata,
+            'spec': built_spec,
+            'status': {
+                'availableReplicas': replicas,
+                'updatedReplicas': replicas,
+                'observedGeneration': replicas,
+                'readyReplicas': replicas,
+                'replicas': replicas
+            }
+        }
+
+    def __build_strategy(self, strategy):
+        strategy_type = strategy.get('type') or 'RollingUpdate'
+        built = {'type': strategy_type}
+        if strategy_type == 'RollingUpdate':
+            rolling_update = strategy.get('rollingUpdate') or {}
+            built['rollingUpdate'] = {
+                'maxSurge': rolling_update.get('maxSurge', 1),
+                'maxUnavailable': rolling_update.get('maxUnavailable', 1)
+            }
+        return built
+
     def __create_child_rs(self, template, replicas, revision='1'):
         rs_template = copy.deepcopy(template)
         rs_template.update({'apiVersion': 'apps/v1', 'kind': 'ReplicaSet'})
@@ -1122,9 +1600,12 @@ class Deployment(FakeObject):
                             'replicasets', rs_template)
         rs_obj.create()
 
+    def render(self, obj, **extra_prop):
+        if 'annotations' not in obj['metadata']:
+            obj['metadata']['annotations'] = {}
+        return super(Deployment, self).render(obj, **extra_prop)
+
     def create(self):
-        if 'annotations' not in self.content['metadata']:
-            self.content['metadata']['annotations'] = {}
         obj = super(Deployment, self).create()
         if obj:
             self.__create_child_rs(obj, obj['spec']['replicas'])
@@ -7,6 +7,7 @@ import copy
 
 CWD = os.path.dirname(__file__)
 swagger_path = os.path.join(CWD, 'swagger.json')
+resource_list_path = os.path.join(CWD, 'resource_list.json')
 
 
 def gen_api_groups():
@@ -56,15 +57,42 @@ def gen_api_groups():
                                               [])
                 resource_list[key][group_version_kind['version']].append(
                     resource_definition)
-    with open('resource_list.json', 'w') as f:
+    with open(resource_list_path, 'w') as f:
         json.dump(resource_list, f, indent=2)
 
 
+def is_outdated():
+    if not os.path.exists(resource_list_path):
+        return True
+    return os.path.exists(swagger_path) and \
+        os.path.getmtime(swagger_path) > os.path.getmtime(resource_list_path)
+
+
+def load_resource_list():
+    if is_outdated():
+        gen_api_groups()
+    with open(resource_list_path) as f:
+        return json.load(f)
+
+
+def gen_resource_kinds(resource_list):
+    resource_kinds = {}
+    for base, groups in resource_list.iteritems():
+        for group, versions in groups.iteritems():
+            if isinstance(versions, list):
+                versions = {None: versions}
+            for version, resources in versions.iteritems():
+                group_version = '/'.join(filter(None, [group, version]))
+                for resource in resources:
+                    resource_kinds[(base, group_version, resource['name'])] = \
+                        (resource['kind'], resource['namespaced'])
+    return resource_kinds
+
+
 class FakeResources(object):
 
     def __init__(self):
-        with open(os.path.join(CWD, 'resource_list.json')) as f:
-            self.resource_list = json.load(f)
+        self.resource_list = RESOURCE_LIST
 
     def _get_paths(self, data, paths, parent='/'):
         if isinstance(data, dict):
@@ -155,5 +183,5 @@ class FakeResources(object):
             return {'code': 200, 'response': self._get_api_resource_list(path)}
 
 
-if not os.path.exists(os.path.join(CWD, 'resource_list.json')):
-    gen_api_groups()
+RESOURCE_LIST = load_resource_list()
+RESOURCE_KINDS = gen_resource_kinds(RESOURCE_LIST)
@@ -0,0 +1,82 @@
+# coding=UTF-8
+import re
+from flask import json, request
+from werkzeug.routing import RequestRedirect
+from fake_client import failure_content
+from store import AlreadyExists, Conflict
+
+
+HEADER = 'X-Fake-K8s-Fork'
+NAME = re.compile('^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']
+
+
+def describe(forked, name):
+    return {
+        'name': name,
+        'parent': forked.parents[name],
+        'resourceVersion': str(forked.forks[name].revision)
+    }
+
+
+def install(app, forked):
+    def respond(code, content):
+        return app.response_class(response=json.dumps(content), status=code,
+                                  mimetype='application/json')
+
+    def not_found(name):
+        return respond(404, failure_content(
+            404, 'NotFound', 'fork "%s" not found' % name))
+
+    @app.before_request
+    def select_fork():
+        name = (request.view_args or {}).get('fork') or \
+            request.headers.get(HEADER)
+        try:
+            forked.select(name)
+        except KeyError:
+            forked.select(None)
+            return not_found(name)
+
+    @app.route('/forks/<fork>/<path:path>', methods=METHODS)
+    def forked_api(fork, path):
+        adapter = app.url_map.bind_to_environ(request.environ)
+        try:
+            endpoint, values = adapter.match('/' + path, request.method)
+        except RequestRedirect:
+            endpoint = None
+        if endpoint in [None, 'forked_api']:
+            return respond(404, failure_content(
+                404, 'NotFound', 'the server could not find the requested '
+                'resource'))
+        return app.view_functions[endpoint](**values)
+
+    @app.route('/forks')
+    def list_forks():
+        return respond(200, {'items': [describe(forked, name)
+                                       for name in forked.forks.keys()]})
+
+    @app.route('/forks/<name>', methods=['GET', 'POST', 'DELETE'])
+    def fork(name):
+        if request.method == 'POST':
+            if not NAME.match(name):
+                return respond(400, failure_content(
+                    400, 'BadRequest', 'invalid fork name "%s"' % name))
+            parent = request.args.get('from')
+            try:
+                forked.fork(name, parent)
+            except AlreadyExists as e:
+                return respond(409, failure_content(409, 'AlreadyExists',
+                                                    str(e)))
+            except KeyError:
+                return not_found(parent)
+            return respond(201, describe(forked, name))
+        try:
+            content = describe(forked, name)
+            if request.method == 'DELETE':
+                forked.drop(name)
+        except KeyError:
+            return not_found(name)
+        except Conflict as e:
+            return respond(409, failure_content(409, 'Conflict', str(e)))
+        return respond(200, content)
@@ -0,0 +1,172 @@
+# coding=UTF-8
+import json
+import os
+from collections import OrderedDict
+import fake_objects
+from fake_client import RESOURCES
+from fake_objects import SCHEDULER, STORE
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+BATCH_SIZE = 1000
+
+FORMATS = {
+    '.json': 'json',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.yaml': 'yaml',
+    '.yml': 'yaml'
+}
+
+CONTENT_TYPES = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/yaml': 'yaml',
+    'application/x-yaml': 'yaml',
+    'text/yaml': 'yaml'
+}
+
+FIRST = ['namespaces', 'nodes']
+
+
+class LoadError(Exception):
+    pass
+
+
+def gen_kinds(resources):
+    kinds = {}
+    for (base, version, key), (kind, namespaced, obj_class) in sorted(
+            resources.iteritems()):
+        kinds.setdefault((version, kind), (key, namespaced, obj_class))
+    return kinds
+
+
+KINDS = gen_kinds(RESOURCES)
+
+
+def sniff(content):
+    stripped = content.lstrip()
+    if not stripped.startswith(('{', '[')):
+        return 'yaml'
+    try:
+        json.loads(content)
+    except ValueError:
+        return 'ndjson'
+    return 'json'
+
+
+def parse(content, content_format=None):
+    content_format = content_format or sniff(content)
+    if content_format == 'yaml':
+        if yaml is None:
+            raise LoadError('PyYAML is required to load YAML documents')
+        try:
+            return [doc for doc in yaml.safe_load_all(content)
+                    if doc is not None]
+        except yaml.YAMLError as e:
+            raise LoadError('invalid YAML: %s' % e)
+    if content_format == 'ndjson':
+        docs = []
+        for number, line in enumerate(content.splitlines(), 1):
+            if line.strip():
+                try:
+                    docs.append(json.loads(line))
+                except ValueError as e:
+                    raise LoadError('line %d: %s' % (number, e))
+        return docs
+    try:
+        doc = json.loads(content)
+    except ValueError as e:
+        raise LoadError('invalid JSON: %s' % e)
+    return doc if isinstance(doc, list) else [doc]
+
+
+def expand(docs):
+    for doc in docs:
+        if isinstance(doc, dict) and doc.get('kind', '').endswith('List') \
+                and isinstance(doc.get('items'), list):
+            for item in doc['items']:
+                yield item
+        else:
+            yield doc
+
+
+def validate(index, doc):
+    if not isinstance(doc, dict):
+        raise LoadError('document %d: not an object' % index)
+    for field in ['apiVersion', 'kind']:
+        if not doc.get(field):
+            raise LoadError('document %d: %s is required' % (index, field))
+    metadata = doc.get('metadata')
+    if not isinstance(metadata, dict) or not metadata.get('name'):
+        raise LoadError('document %d: metadata.name is required' % index)
+    resource = KINDS.get((doc['apiVersion'], doc['kind']))
+    if resource is None:
+        raise LoadError('document %d: unknown kind %s in %s' % (
+            index, doc['kind'], doc['apiVersion']))
+    return resource
+
+
+def load(docs):
+    pending = OrderedDict((key, None) for key in FIRST)
+    seen = set()
+    namespaces = set()
+    for index, doc in enumerate(expand(docs)):
+        key, namespaced, obj_class = validate(index, doc)
+        metadata = doc['metadata']
+        namespace = (metadata.get('namespace') or 'default') \
+            if namespaced else None
+        if (key, namespace, metadata['name']) in seen:
+            raise LoadError('document %d: duplicate %s "%s"' % (
+                index, key, metadata['name']))
+        seen.add((key, namespace, metadata['name']))
+        if namespace is not None:
+            namespaces.add(namespace)
+        if pending.get(key) is None:
+            pending[key] = (obj_class, [])
+        pending[key][1].append(obj_class(doc['kind'], metadata['name'],
+                                         namespace, key, doc))
+    missing = sorted(
+        namespace for namespace in namespaces
+        if ('namespaces', None, namespace) not in seen and
+        STORE.get('namespaces', None, namespace) is None)
+    if missing:
+        raise LoadError('namespaces not found: %s' % ', '.join(missing))
+    batches = []
+    placement = None
+    for key, entry in pending.iteritems():
+        if entry is None:
+            continue
+        obj_class, objs = entry
+        contents = []
+        for start in xrange(0, len(objs), BATCH_SIZE):
+            batch = objs[start:start + BATCH_SIZE]
+            try:
+                if issubclass(obj_class, fake_objects.Pod):
+                    if placement is None:
+                        placement = SCHEDULER.placement(
+                            dict(batches).get('nodes'))
+                    contents.extend(obj_class.render_many(
+                        batch, placement=placement))
+                else:
+                    contents.extend(obj_class.render_many(batch))
+            except Exception as e:
+                raise LoadError('%s %d-%d: cannot build objects: %r' % (
+                    key, start, start + len(batch) - 1, e))
+        batches.append((key, contents))
+    revision = STORE.bulk_create(batches)
+    return {
+        'loaded': dict((key, len(contents)) for key, contents in batches),
+        'resourceVersion': str(revision)
+    }
+
+
+def load_file(path, content_format=None):
+    with open(path) as f:
+        content = f.read()
+    return load(parse(content, content_format or FORMATS.get(
+        os.path.splitext(path)[1].lower())))
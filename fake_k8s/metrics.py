@@ -0,0 +1,225 @@
+# coding=UTF-8
+import bisect
+import threading
+import time
+from flask import request
+from functools import wraps
+
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+           0.5, 1.0, 2.5, 5.0, 10.0)
+
+VERBS = {
+    'POST': 'create',
+    'PUT': 'update',
+    'PATCH': 'patch',
+    'DELETE': 'delete'
+}
+
+STORE_METHODS = ['get', 'list', 'query', 'snapshot', 'page', 'create',
+                 'create_many', 'update', 'delete']
+
+_local = threading.local()
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+class Histogram(object):
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append('%s_bucket{%s,le="%s"} %d' % (
+                name, labels, bound, cumulative))
+        lines.append('%s_sum{%s} %f' % (name, labels, self.sum))
+        lines.append('%s_count{%s} %d' % (name, labels, self.count))
+        return lines
+
+
+class Registry(object):
+    def __init__(self, resources=None):
+        self.resources = resources
+        self.requests = {}
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def _observe(self, histograms, labels, value):
+        histogram = histograms.get(labels)
+        if histogram is None:
+            histogram = histograms[labels] = Histogram()
+        histogram.observe(value)
+
+    def observe(self, verb, resource, total, phases):
+        with self._lock:
+            self._observe(self.requests, (verb, resource), total)
+            for phase, elapsed in phases.iteritems():
+                self._observe(self.phases, (verb, resource, phase), elapsed)
+
+    def render(self, store):
+        lines = [
+            '# HELP fake_k8s_request_duration_seconds Request handling time.',
+            '# TYPE fake_k8s_request_duration_seconds histogram'
+        ]
+        with self._lock:
+            for (verb, resource), histogram in sorted(
+                    self.requests.iteritems()):
+                lines.extend(histogram.render(
+                    'fake_k8s_request_duration_seconds',
+                    'verb="%s",resource="%s"' % (escape(verb),
+                                                 escape(resource))))
+            lines.extend([
+                '# HELP fake_k8s_request_phase_seconds Time spent in each '
+                'phase of a request.',
+                '# TYPE fake_k8s_request_phase_seconds histogram'
+            ])
+            for (verb, resource, phase), histogram in sorted(
+                    self.phases.iteritems()):
+                lines.extend(histogram.render(
+                    'fake_k8s_request_phase_seconds',
+                    'verb="%s",resource="%s",phase="%s"' % (
+                        escape(verb), escape(resource), escape(phase))))
+        lines.extend([
+            '# HELP fake_k8s_store_objects Objects in the store.',
+            '# TYPE fake_k8s_store_objects gauge'
+        ])
+        for resource, size in sorted(store.sizes().iteritems()):
+            if self.resources is not None and resource not in self.resources:
+                continue
+            lines.append('fake_k8s_store_objects{resource="%s"} %d' % (
+                escape(resource), size))
+        lines.extend([
+            '# HELP fake_k8s_store_revision Latest resource version.',
+            '# TYPE fake_k8s_store_revision gauge',
+            'fake_k8s_store_revision %d' % store.revision
+        ])
+        return '\n'.join(lines) + '\n'
+
+
+class RequestTimer(object):
+    def __init__(self):
+        self.start = time.time()
+        self.phases = {}
+        self.active = set()
+        self.verb = request.method.lower()
+        self.resource = request.endpoint or 'unknown'
+
+
+def timed(phase, func):
+    @wraps(func)
+    def wrap(*args, **kwargs):
+        timer = getattr(_local, 'timer', None)
+        if timer is None or phase in timer.active:
+            return func(*args, **kwargs)
+        timer.active.add(phase)
+        start = time.time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timer.phases[phase] = timer.phases.get(phase, 0.0) + \
+                time.time() - start
+            timer.active.discard(phase)
+    return wrap
+
+
+def instrument(target, name, phase):
+    setattr(target, name, timed(phase, getattr(target, name)))
+
+
+def routed(func):
+    import fake_client
+    func = timed('route', func)
+
+    @wraps(func)
+    def wrap(path):
+        api_targets = func(path)
+        timer = getattr(_local, 'timer', None)
+        if timer is not None:
+            if api_targets['base'] and api_targets['version'] and \
+                    api_targets['global_kind']:
+                resource = api_targets['kind'] or api_targets['global_kind']
+                timer.resource = resource if (
+                    api_targets['base'], api_targets['version'],
+                    resource) in fake_client.RESOURCES else 'unknown'
+                name = api_targets['name'] if api_targets['kind'] \
+                    else api_targets['global_name']
+                if request.method == 'GET':
+                    if request.args.get('watch') in ['true', '1']:
+                        timer.verb = 'watch'
+                    else:
+                        timer.verb = 'get' if name else 'list'
+                else:
+                    timer.verb = VERBS.get(request.method, timer.verb)
+            else:
+                timer.resource = 'discovery'
+        return api_targets
+    return wrap
+
+
+def install(app, store):
+    import fake_client
+    import fake_objects
+    import fake_resources
+    import utils
+    for name in STORE_METHODS:
+        instrument(store, name, 'store')
+    persistence = getattr(store, 'persistence', None)
+    if persistence:
+        for name in ['load', 'save', 'wait']:
+            if hasattr(persistence, name):
+                instrument(persistence, name, 'persist')
+    instrument(fake_client, 'namespace_exists', 'namespace')
+    instrument(utils, 'parse_label_selector', 'selector')
+    instrument(utils, 'parse_field_selector', 'selector')
+    instrument(fake_objects.FakeObject, 'render', 'render')
+    instrument(fake_objects.FakeObject, 'render_template', 'template')
+    instrument(fake_objects, 'literal_eval', 'literal_eval')
+    instrument(fake_resources.FakeResources, 'get', 'discovery')
+    registry = Registry(set(key for _, _, key in fake_client.RESOURCES))
+
+    @app.before_request
+    def start_timer():
+        _local.timer = RequestTimer()
+
+    def finish_timer(timer):
+        if getattr(_local, 'timer', None) is timer:
+            _local.timer = None
+        if app.config['METRICS']:
+            registry.observe(timer.verb, timer.resource,
+                             time.time() - timer.start, timer.phases)
+
+    @app.after_request
+    def stop_timer(response):
+        timer = getattr(_local, 'timer', None)
+        if timer is None:
+            return response
+        if app.config['SERVER_TIMING']:
+            response.headers['Server-Timing'] = ', '.join(
+                '%s;dur=%.3f' % (phase, elapsed * 1e3) for phase, elapsed in
+                sorted(timer.phases.iteritems()) +
+                [('total', time.time() - timer.start)])
+        response.call_on_close(lambda: finish_timer(timer))
+        return response
+
+    if app.config['METRICS']:
+        @app.route('/metrics')
+        def metrics():
+            return app.response_class(
+                response=registry.render(store), status=200,
+                mimetype='text/plain; version=0.0.4')
+
+    return registry
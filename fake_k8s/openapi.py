@@ -0,0 +1,65 @@
+# coding=UTF-8
+import gzip
+import hashlib
+import json
+import os
+import threading
+from flask import current_app as app
+
+
+VARIANTS = {
+    'pretty': {'indent': 2, 'sort_keys': True},
+    'compact': {'separators': (',', ':'), 'sort_keys': True}
+}
+
+
+class OpenAPISpec(object):
+    def __init__(self, swagger_path):
+        self.swagger_path = swagger_path
+        self.mtime = None
+        self.files = {}
+        self._lock = threading.Lock()
+
+    def _write(self, path, content, compress=False):
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        if compress:
+            with open(tmp_path, 'wb') as f:
+                with gzip.GzipFile(fileobj=f, mode='wb', mtime=0) as gz:
+                    gz.write(content)
+        else:
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+        os.rename(tmp_path, path)
+        return path
+
+    def _build(self):
+        cache_dir = os.path.join(app.config['CACHE_CONFIG']['CACHE_DIR'],
+                                 'openapi')
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        with open(self.swagger_path) as f:
+            swagger = json.load(f)
+        files = {}
+        for variant, options in VARIANTS.iteritems():
+            content = json.dumps(swagger, **options)
+            digest = hashlib.md5(content).hexdigest()
+            path = os.path.join(cache_dir, '%s.json' % digest)
+            files[variant, False] = (self._write(path, content),
+                                     '%s-%s' % (digest, variant))
+            files[variant, True] = (self._write(path + '.gz', content, True),
+                                    '%s-%s-gzip' % (digest, variant))
+        paths = set(path for path, etag in files.itervalues())
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            if path not in paths and not name.endswith('.tmp'):
+                os.remove(path)
+        return files
+
+    def get(self, variant, gzipped=False):
+        mtime = os.path.getmtime(self.swagger_path)
+        if mtime != self.mtime:
+            with self._lock:
+                if mtime != self.mtime:
+                    self.files = self._build()
+                    self.mtime = mtime
+        return self.files[variant, gzipped]
@@ -0,0 +1,214 @@
+# coding=UTF-8
+import cProfile
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from flask import json, request
+from StringIO import StringIO
+from fake_client import failure_content
+
+
+MODES = ['cprofile', 'sampling']
+FORMATS = {
+    'cprofile': ['text', 'pstats'],
+    'sampling': ['collapsed']
+}
+SAMPLE_INTERVAL = 0.005
+
+_local = threading.local()
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return '%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename),
+                           code.co_firstlineno)
+
+
+def collapse(frame):
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Session(object):
+    def __init__(self, mode, seconds=None, requests=None):
+        self.mode = mode
+        self.started = time.time()
+        self.deadline = self.started + seconds if seconds else None
+        self.remaining = requests
+        self.requests = 0
+        self.samples = 0
+        self.stats = None
+        self.stacks = Counter()
+        self.finished = threading.Event()
+        self._active = set()
+        self._lock = threading.Lock()
+        if mode == 'sampling':
+            sampler = threading.Thread(target=self._sample)
+            sampler.daemon = True
+            sampler.start()
+
+    def _sample(self):
+        while not self.done:
+            time.sleep(SAMPLE_INTERVAL)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident in self._active:
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        self.stacks[collapse(frame)] += 1
+                        self.samples += 1
+
+    @property
+    def done(self):
+        if not self.finished.is_set() and self.deadline is not None and \
+                time.time() >= self.deadline:
+            self.finished.set()
+        return self.finished.is_set()
+
+    def enter(self):
+        if self.mode == 'cprofile':
+            _local.profile = cProfile.Profile()
+            _local.profile.enable()
+        else:
+            with self._lock:
+                self._active.add(threading.current_thread().ident)
+
+    def leave(self):
+        if self.mode == 'cprofile':
+            profile = _local.profile
+            profile.disable()
+            _local.profile = None
+        else:
+            profile = None
+        with self._lock:
+            if self.mode == 'cprofile':
+                if self.stats is None:
+                    self.stats = pstats.Stats(profile)
+                else:
+                    self.stats.add(profile)
+            else:
+                self._active.discard(threading.current_thread().ident)
+            self.requests += 1
+            if self.remaining is not None:
+                self.remaining -= 1
+                if self.remaining <= 0:
+                    self.finished.set()
+
+    def status(self):
+        return {
+            'mode': self.mode,
+            'done': self.done,
+            'elapsed': time.time() - self.started,
+            'requests': self.requests,
+            'samples': self.samples
+        }
+
+    def dump(self, output_format):
+        with self._lock:
+            if output_format == 'collapsed':
+                return ''.join('%s %d\n' % (stack, count) for stack, count
+                               in sorted(self.stacks.iteritems()))
+            if self.stats is None:
+                return ''
+            if output_format == 'pstats':
+                return marshal.dumps(self.stats.stats)
+            stream = StringIO()
+            self.stats.stream = stream
+            self.stats.sort_stats('cumulative').print_stats()
+            return stream.getvalue()
+
+
+def positive(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        value = 0
+    if value <= 0:
+        raise ValueError('%s must be a positive integer' % name)
+    return value
+
+
+def install(app):
+    state = {'session': None}
+
+    def respond(code, content):
+        return app.response_class(response=json.dumps(content), status=code,
+                                  mimetype='application/json')
+
+    def stop(session):
+        if session is not None and getattr(_local, 'session', None) is \
+                session:
+            _local.session = None
+            session.leave()
+
+    @app.before_request
+    def start_profile():
+        stop(getattr(_local, 'session', None))
+        session = state['session']
+        if session is not None and request.endpoint != 'profile' and \
+                not session.done:
+            _local.session = session
+            session.enter()
+
+    @app.after_request
+    def stop_profile(response):
+        session = getattr(_local, 'session', None)
+        if session is not None:
+            response.call_on_close(lambda: stop(session))
+        return response
+
+    @app.teardown_request
+    def abandon_profile(exception):
+        if exception is not None:
+            stop(getattr(_local, 'session', None))
+
+    @app.route('/debug/profile', methods=['GET', 'POST'])
+    def profile():
+        session = state['session']
+        if request.method == 'POST':
+            mode = request.args.get('mode', 'cprofile')
+            if mode not in MODES:
+                return respond(400, failure_content(
+                    400, 'BadRequest', 'mode must be one of: %s' %
+                    ', '.join(MODES)))
+            try:
+                seconds, requests = positive('seconds'), positive('requests')
+            except ValueError as e:
+                return respond(400, failure_content(400, 'BadRequest',
+                                                    str(e)))
+            if (seconds is None) == (requests is None):
+                return respond(400, failure_content(
+                    400, 'BadRequest', 'exactly one of seconds or requests '
+                    'is required'))
+            if session is not None and not session.done:
+                return respond(409, failure_content(
+                    409, 'Conflict', 'a profile is already running'))
+            session = state['session'] = Session(mode, seconds, requests)
+            return respond(202, session.status())
+        if session is None:
+            return respond(404, failure_content(
+                404, 'NotFound', 'no profile has been started'))
+        if not session.done:
+            return respond(409, failure_content(
+                409, 'Conflict', 'the profile is still running: %s' %
+                json.dumps(session.status())))
+        output_format = request.args.get('format',
+                                          FORMATS[session.mode][0])
+        if output_format not in FORMATS[session.mode]:
+            return respond(400, failure_content(
+                400, 'BadRequest', 'format must be one of: %s' %
+                ', '.join(FORMATS[session.mode])))
+        return app.response_class(
+            response=session.dump(output_format), status=200,
+            mimetype='application/octet-stream'
+            if output_format == 'pstats' else 'text/plain')
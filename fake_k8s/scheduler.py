@@ -0,0 +1,295 @@
+# coding=UTF-8
+import random
+import re
+import threading
+import weakref
+import events
+import utils
+from store import index_keys
+
+
+SAMPLE_SIZE = 100
+CANDIDATE_CACHE_SIZE = 256
+QUANTITY = re.compile('^([0-9]*\.?[0-9]+)([a-zA-Z]*)$')
+SUFFIXES = {
+    '': 1, 'm': 0.001,
+    'k': 10 ** 3, 'M': 10 ** 6, 'G': 10 ** 9, 'T': 10 ** 12, 'P': 10 ** 15,
+    'E': 10 ** 18,
+    'Ki': 2 ** 10, 'Mi': 2 ** 20, 'Gi': 2 ** 30, 'Ti': 2 ** 40, 'Pi': 2 ** 50,
+    'Ei': 2 ** 60
+}
+DEFAULT_REQUESTS = (0.1, 200 * 2 ** 20)
+TERMINATED = ['Succeeded', 'Failed']
+ZERO = (0, 0, 0)
+
+
+def quantity(value):
+    match = QUANTITY.match(str(value).strip())
+    if not match or match.group(2) not in SUFFIXES:
+        return 0
+    return float(match.group(1)) * SUFFIXES[match.group(2)]
+
+
+def canonical(spec):
+    terms = (((spec.get('affinity') or {}).get('nodeAffinity') or {}).get(
+        'requiredDuringSchedulingIgnoredDuringExecution') or {}).get(
+        'nodeSelectorTerms') or []
+    expressions = set()
+    for term in terms:
+        for expression in term.get('matchExpressions') or []:
+            expressions.add((expression['key'], expression['operator'],
+                             tuple(sorted(expression.get('values') or []))))
+    return (tuple(sorted((spec.get('nodeSelector') or {}).iteritems())),
+            tuple(sorted(expressions)))
+
+
+@utils.LRUCache(utils.SELECTOR_CACHE_SIZE)
+def compile_selectors(form):
+    node_selector, expressions = form
+    selectors = utils.as_selectors(dict(node_selector))
+    selectors.extend(utils.as_selectors([
+        {'key': key, 'operator': operator, 'values': list(values)}
+        for key, operator, values in expressions]))
+    return tuple(selectors)
+
+
+def allocatable(node):
+    values = (node.get('status') or {}).get('allocatable') or {}
+    return tuple(quantity(values.get(resource, 0))
+                 for resource in ['pods', 'cpu', 'memory'])
+
+
+def requests(pod):
+    cpu = memory = 0
+    for container in (pod.get('spec') or {}).get('containers') or []:
+        values = (container.get('resources') or {}).get('requests') or {}
+        cpu += quantity(values['cpu']) if 'cpu' in values \
+            else DEFAULT_REQUESTS[0]
+        memory += quantity(values['memory']) if 'memory' in values \
+            else DEFAULT_REQUESTS[1]
+    return (1, cpu, memory)
+
+
+def binding(pod):
+    node_name = (pod.get('spec') or {}).get('nodeName')
+    if node_name and (pod.get('status') or {}).get('phase') \
+            not in TERMINATED:
+        return node_name
+
+
+def spread(capacity, used):
+    return -used[0]
+
+
+def least_allocated(capacity, used):
+    return sum((capacity[i] - used[i]) / capacity[i] if capacity[i] else 0
+               for i in [1, 2]) / 2
+
+
+STRATEGIES = {
+    'random': None,
+    'spread': spread,
+    'least-allocated': least_allocated
+}
+
+
+class NodeIndex(object):
+    def __init__(self, nodes=()):
+        self.nodes = {}
+        self.capacity = {}
+        self.unschedulable = set()
+        self._postings = {}
+        self._candidates = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        name = node['metadata']['name']
+        self.remove(name)
+        self.nodes[name] = node
+        self.capacity[name] = allocatable(node)
+        if (node.get('spec') or {}).get('unschedulable'):
+            self.unschedulable.add(name)
+        for key in index_keys(node):
+            self._postings.setdefault(key, set()).add(name)
+        self._candidates.clear()
+
+    def remove(self, name):
+        node = self.nodes.pop(name, None)
+        if node is None:
+            return
+        del self.capacity[name]
+        self.unschedulable.discard(name)
+        for key in index_keys(node):
+            postings = self._postings[key]
+            postings.discard(name)
+            if not postings:
+                del self._postings[key]
+        self._candidates.clear()
+
+    def candidates(self, form):
+        names = self._candidates.get(form)
+        if names is None:
+            if len(self._candidates) >= CANDIDATE_CACHE_SIZE:
+                self._candidates.clear()
+            names = self._candidates[form] = self._match(
+                compile_selectors(form))
+        return names
+
+    def _match(self, selectors):
+        names = None
+        for selector in selectors:
+            keys = selector.index_keys
+            if keys:
+                postings = set().union(*[self._postings.get(key, ())
+                                         for key in keys])
+                names = postings if names is None else names & postings
+        return sorted(
+            name for name in (self.nodes if names is None else names)
+            if name not in self.unschedulable and
+            all(selector(self.nodes[name]) for selector in selectors))
+
+
+class ClusterState(object):
+    def __init__(self, track_usage):
+        self.track_usage = track_usage
+        self.index = NodeIndex()
+        self.usage = {}
+        self.generation = None
+        self._revisions = {}
+
+    def sync(self, store):
+        if store.events.generation != self.generation:
+            self.generation = store.events.generation
+            self._revisions = {}
+        self._follow(store, 'nodes', self._reset_nodes, self._node_event)
+        if self.track_usage:
+            self._follow(store, 'pods', self._reset_pods, self._pod_event)
+
+    def _follow(self, store, resource, reset, apply):
+        revision = self._revisions.get(resource)
+        if revision is not None:
+            try:
+                changes = store.events.since(resource, revision)
+            except events.Expired:
+                pass
+            else:
+                for event in changes:
+                    apply(event)
+                if changes:
+                    self._revisions[resource] = changes[-1].revision
+                return
+        self._revisions[resource], objs = store.snapshot(resource)
+        reset(objs)
+
+    def _reset_nodes(self, nodes):
+        self.index = NodeIndex(nodes)
+
+    def _node_event(self, event):
+        if event.type == events.DELETED:
+            self.index.remove(event.obj['metadata']['name'])
+        else:
+            self.index.add(event.obj)
+
+    def _reset_pods(self, pods):
+        self.usage = {}
+        for pod in pods:
+            self._bind(pod, 1)
+
+    def _pod_event(self, event):
+        if event.type == events.MODIFIED:
+            self._bind(event.old, -1)
+        self._bind(event.obj, -1 if event.type == events.DELETED else 1)
+
+    def _bind(self, pod, sign):
+        node_name = binding(pod)
+        if node_name:
+            used = self.usage.get(node_name, ZERO)
+            self.usage[node_name] = tuple(
+                total + sign * value
+                for total, value in zip(used, requests(pod)))
+
+
+class Placement(object):
+    def __init__(self, scheduler, state, index):
+        self.scheduler = scheduler
+        self.state = state
+        self.index = index
+        self.used = {}
+
+    def __call__(self, pod):
+        spec = pod.get('spec') or {}
+        node = self.scheduler.select(self, spec)
+        if node is not None and self.state.track_usage and \
+                'nodeName' not in spec:
+            name = node['metadata']['name']
+            self.used[name] = tuple(
+                total + value
+                for total, value in zip(self.usage(name), requests(pod)))
+        return node
+
+    def usage(self, name):
+        used = self.used.get(name)
+        return self.state.usage.get(name, ZERO) if used is None else used
+
+
+class Scheduler(object):
+    def __init__(self, store, strategy='random', seed=None,
+                 sample_size=SAMPLE_SIZE):
+        if strategy not in STRATEGIES:
+            raise ValueError('strategy must be one of: %s' %
+                             ', '.join(sorted(STRATEGIES)))
+        self.store = store
+        self.score = STRATEGIES[strategy]
+        self.sample_size = sample_size
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._states = weakref.WeakKeyDictionary()
+        self._offset = 0
+
+    @classmethod
+    def from_config(cls, store, config):
+        return cls(store, strategy=config.get('STRATEGY', 'random'),
+                   seed=config.get('SEED'),
+                   sample_size=config.get('SAMPLE_SIZE', SAMPLE_SIZE))
+
+    def placement(self, nodes=None):
+        with self._lock:
+            key = self.store.events
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = ClusterState(
+                    self.score is not None)
+            state.sync(self.store)
+            index = state.index
+            if nodes:
+                index = NodeIndex(index.nodes.values() + list(nodes))
+        return Placement(self, state, index)
+
+    def select(self, placement, spec):
+        with self._lock:
+            nodes = placement.index.nodes
+            if 'nodeName' in spec:
+                return nodes.get(spec['nodeName'])
+            names = placement.index.candidates(canonical(spec))
+            if not names:
+                return None
+            if self.score is None:
+                return nodes[self.random.choice(names)]
+            return nodes[self._best(placement, names)]
+
+    def _best(self, placement, names):
+        if len(names) > self.sample_size:
+            start = self._offset % len(names)
+            self._offset += self.sample_size
+            names = (names[start:start + self.sample_size] +
+                     names[:max(0, start + self.sample_size - len(names))])
+        capacity = placement.index.capacity
+        best, chosen = None, []
+        for name in names:
+            score = self.score(capacity[name], placement.usage(name))
+            if best is None or score > best:
+                best, chosen = score, [name]
+            elif score == best:
+                chosen.append(name)
+        return self.random.choice(chosen)
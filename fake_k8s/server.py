@@ -1,7 +1,11 @@
 # coding=UTF-8
 from flask import Flask, json, request
+from werkzeug.wsgi import wrap_file
+import cli
+import metrics
 import settings
-import argparse
+import store
+import utils
 import os
 import re
 try:
@@ -10,27 +14,93 @@ except Exception:
     from urllib.parse import urlparse, parse_qs
 
 
+SERVERS = ['flask', 'gunicorn']
+GUNICORN_THREADS = 8
+
+
+def parse_args():
+    parser = cli.base_parser()
+    parser.add_argument('--server', choices=SERVERS, default='flask',
+                        help='HTTP server to run the API with')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes (gunicorn only)')
+    parser.add_argument('--threads', type=int,
+                        help='Number of request threads per worker, each '
+                             'open watch holds one (gunicorn only, default '
+                             '%d)' % GUNICORN_THREADS)
+    parser.add_argument('--keep-alive', dest='keep_alive', type=int,
+                        default=5,
+                        help='Seconds to keep idle connections open '
+                             '(gunicorn only)')
+    args = parser.parse_args()
+    if (args.workers > 1 or (args.threads or 1) > 1) and \
+            args.server != 'gunicorn':
+        parser.error('--workers and --threads require --server gunicorn')
+    if args.workers > 1 and args.store == 'memory':
+        parser.error('the memory store cannot be shared by several workers')
+    if args.workers > 1 and args.forks:
+        parser.error('forks cannot be shared by several workers')
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    cli.configure(settings, args, args.workers)
 app = Flask(__name__)
 app.config.from_object(settings)
 cxt = app.app_context()
 cxt.push()
 
 
-from fake_client import FakeRequest
-from fake_resources import FakeResources
+from fake_client import FakeRequest, RESOURCES, failure_content
+from fake_objects import STORE
+from fake_resources import FakeResources, swagger_path
+from openapi import OpenAPISpec
+import forks
+import loader
+import profiler
+import snapshot
+
+
+OPENAPI = OpenAPISpec(swagger_path)
+RESOURCE_NAMES = sorted(set(key for _, _, key in RESOURCES))
+SNAPSHOT_NAME = re.compile('^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+
+
+URL_PATTERN = re.compile(
+    '^(\/(?P<base>[^\/]+))?(\/(?P<version>v1|[^\/]+\/[^\/]+))?'
+    '(\/(?P<global_kind>[^\/]+))?(\/(?P<global_name>[^\/]+))?'
+    '(\/(?P<kind>[^\/]+))?(\/(?P<name>[^\/]+))?'
+    '(\/(?P<operation>[^\/]+))?')
+
+
+def route(path):
+    match = URL_PATTERN.match('/' + path)
+    assert match is not None, \
+        ("The request url does not match with '%s'" % URL_PATTERN.pattern)
+    return match.groupdict()
+
+
+if app.config['METRICS'] or app.config['SERVER_TIMING']:
+    route = metrics.routed(route)
+    metrics.install(app, STORE)
+
+if app.config['PROFILER']:
+    profiler.install(app)
+
+if app.config['STORE_CONFIG'].get('FORKS'):
+    forks.install(app, STORE)
+
+if app.config['RESTORE_PATH']:
+    snapshot.restore(STORE, RESOURCE_NAMES, app.config['RESTORE_PATH'])
+for load_path in app.config['LOAD_PATHS']:
+    loader.load_file(load_path)
 
 
 @app.route('/')
 @app.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
 def api(path=''):
-    url_pattern = ('^(\/(?P<base>[^\/]+))?(\/(?P<version>v1|[^\/]+\/[^\/]+))?'
-                   '(\/(?P<global_kind>[^\/]+))?(\/(?P<global_name>[^\/]+))?'
-                   '(\/(?P<kind>[^\/]+))?(\/(?P<name>[^\/]+))?'
-                   '(\/(?P<operation>[^\/]+))?')
-    match = re.match(url_pattern, '/' + path)
-    assert match is not None, \
-        ("The request url does not match with '%s'" % url_pattern)
-    api_targets = match.groupdict()
+    api_targets = route(path)
     if api_targets['base'] and api_targets['version'] and \
             api_targets['global_kind']:
         session = FakeRequest()
@@ -44,6 +114,18 @@ def api(path=''):
     else:
         resources = FakeResources()
         output = resources.get(path, api_targets)
+    if output['response'].get('stream'):
+        return app.response_class(
+            response=output['response']['stream'],
+            status=output['code'],
+            mimetype='application/json'
+        )
+    if isinstance(output['response'].get('items'), list):
+        return app.response_class(
+            response=utils.iter_json(output['response']),
+            status=output['code'],
+            mimetype='application/json'
+        )
     content = output['response'].get('content') or \
         json.dumps(output['response'])
     response = app.response_class(
@@ -77,24 +159,112 @@ def version():
 
 @app.route('/openapi/v2')
 def openapi():
-    swagger_path = os.path.join(os.path.dirname(__file__), 'swagger.json')
-    with open(swagger_path) as f:
-        swagger = json.load(f)
-    response = app.response_class(
-        response=json.dumps(swagger, indent=2),
-        status=200,
+    variant = 'compact' if 'protobuf' in request.headers.get('Accept', '') \
+        else 'pretty'
+    gzipped = bool(request.accept_encodings['gzip'])
+    path, etag = OPENAPI.get(variant, gzipped)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(
+            response=wrap_file(request.environ, open(path, 'rb')),
+            status=200,
+            mimetype='application/json',
+            direct_passthrough=True
+        )
+        response.content_length = os.path.getsize(path)
+        if gzipped:
+            response.content_encoding = 'gzip'
+    response.set_etag(etag)
+    response.vary.update(['Accept', 'Accept-Encoding'])
+    return response
+
+
+@app.route('/load', methods=['POST'])
+def bulk_load():
+    try:
+        result = loader.load(loader.parse(
+            request.get_data(), loader.CONTENT_TYPES.get(request.mimetype)))
+        code = 201
+    except loader.LoadError as e:
+        code, result = 400, failure_content(400, 'BadRequest', str(e))
+    except store.AlreadyExists as e:
+        code, result = 409, failure_content(409, 'AlreadyExists', str(e))
+    return app.response_class(
+        response=json.dumps(result),
+        status=code,
         mimetype='application/json'
     )
-    return response
+
+
+def snapshot_path(name):
+    directory = os.path.join(app.config['CACHE_CONFIG']['CACHE_DIR'],
+                             'snapshots')
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    return os.path.join(directory, '%s.snap' % name)
+
+
+@app.route('/snapshots/<name>', methods=['GET', 'POST'])
+@app.route('/snapshots/<name>/<action>', methods=['POST'])
+def snapshots(name, action=None):
+    path = snapshot_path(name) if SNAPSHOT_NAME.match(name) else None
+    if path is None or action not in [None, 'restore']:
+        code, result = 404, failure_content(
+            404, 'NotFound', 'the server could not find the requested '
+            'resource')
+    elif request.method == 'POST' and not action:
+        code, result = 201, snapshot.save(STORE, RESOURCE_NAMES, path)
+    elif not os.path.exists(path):
+        code, result = 404, failure_content(
+            404, 'NotFound', 'snapshot "%s" not found' % name)
+    elif action == 'restore':
+        try:
+            code, result = 200, snapshot.restore(STORE, RESOURCE_NAMES,
+                                                 path)
+        except snapshot.SnapshotError as e:
+            code, result = 400, failure_content(400, 'BadRequest', str(e))
+        except store.Conflict as e:
+            code, result = 409, failure_content(409, 'Conflict', str(e))
+    else:
+        response = app.response_class(
+            response=wrap_file(request.environ, open(path, 'rb')),
+            status=200,
+            mimetype='application/octet-stream',
+            direct_passthrough=True
+        )
+        response.content_length = os.path.getsize(path)
+        return response
+    return app.response_class(
+        response=json.dumps(result),
+        status=code,
+        mimetype='application/json'
+    )
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', '0.0.0.0:6443')
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('threads', args.threads or GUNICORN_THREADS)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('timeout', app.config['WATCH_TIMEOUT'] + 60)
+            self.cfg.set('keepalive', args.keep_alive)
+            self.cfg.set('backlog', args.backlog)
+
+        def load(self):
+            return app
+
+    Application().run()
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--cache-dir', dest='cache_dir',
-                        help='Directory to store cache')
-    args = parser.parse_args()
-    if args.cache_dir:
-        app.config['CACHE_CONFIG']['CACHE_DIR'] = args.cache_dir
-    app.run('0.0.0.0', 6443)
+    if args.server == 'gunicorn':
+        run_gunicorn(args)
+    else:
+        app.run('0.0.0.0', 6443, threaded=True)
 
 cxt.pop()
@@ -12,7 +12,7 @@ MAX_COOKIE_SIZE = 4093
 SESSION_COOKIE_SAMESITE = None
 PROPAGATE_EXCEPTIONS = None
 ENV = "production"
-DEBUG = True
+DEBUG = False
 SECRET_KEY = None
 EXPLAIN_TEMPLATE_LOADING = False
 MAX_CONTENT_LENGTH = None
@@ -36,3 +36,28 @@ CACHE_CONFIG = {
     'CACHE_DIR': '/tmp/cache',
     'CACHE_DEFAULT_TIMEOUT': 0
 }
+STORE_CONFIG = {
+    'STORE_TYPE': 'memory',
+    'STORE_PERSISTENCE': None,
+    'WATCH_HISTORY_SIZE': 1000,
+    'COLUMNAR_INDEX': False,
+    'SQLITE_PATH': None,
+    'FORKS': False,
+    'WAL_DIR': None,
+    'WAL_SYNC': 'batch',
+    'WAL_SYNC_INTERVAL': 1.0,
+    'WAL_COMMIT_DELAY': 0,
+    'WAL_COMPACT_BYTES': 64 * 1024 * 1024
+}
+SCHEDULER_CONFIG = {
+    'STRATEGY': 'random',
+    'SEED': None,
+    'SAMPLE_SIZE': 100
+}
+RENDER_MODE = 'builder'
+WATCH_TIMEOUT = 1800
+METRICS = False
+SERVER_TIMING = False
+PROFILER = False
+LOAD_PATHS = []
+RESTORE_PATH = None
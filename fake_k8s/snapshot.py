@@ -0,0 +1,114 @@
+# coding=UTF-8
+import marshal
+import mmap
+import os
+import struct
+import utils
+
+
+MAGIC = 'FK8SSNAP'
+VERSION = 1
+MARSHAL_VERSION = 2
+HEADER = struct.Struct('>8sHQQ')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def interner():
+    strings = {}
+
+    def intern_string(value):
+        interned = strings.get(value)
+        if interned is None:
+            try:
+                interned = intern(value.encode('ascii')
+                                  if type(value) is unicode else value)
+            except UnicodeEncodeError:
+                interned = value
+            strings[value] = interned
+        return interned
+
+    def intern_all(value):
+        value_type = type(value)
+        if value_type is dict:
+            return dict([(intern_string(key), intern_all(item))
+                         for key, item in value.iteritems()])
+        if value_type is list:
+            return [intern_all(item) for item in value]
+        if value_type is unicode or value_type is str:
+            return intern_string(value)
+        return value
+    return intern_all
+
+
+def save(store, resources, path):
+    revision, contents = store.export(resources)
+    index = {}
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    intern_all = interner()
+    with open(tmp_path, 'wb') as f, utils.gc_paused():
+        f.write(HEADER.pack(MAGIC, VERSION, revision, 0))
+        for resource, objs in sorted(contents.iteritems()):
+            if not objs:
+                continue
+            section = marshal.dumps(intern_all(objs), MARSHAL_VERSION)
+            index[resource] = (f.tell(), len(section), len(objs))
+            f.write(section)
+        index_offset = f.tell()
+        f.write(marshal.dumps(index, MARSHAL_VERSION))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, revision, index_offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(tmp_path, path)
+    return {
+        'resourceVersion': str(revision),
+        'size': os.path.getsize(path),
+        'objects': dict((resource, count)
+                        for resource, (_, _, count) in index.iteritems())
+    }
+
+
+def section_loader(buf, offset, length):
+    def load():
+        with utils.gc_paused():
+            return marshal.loads(buf[offset:offset + length])
+    return load
+
+
+def open_snapshot(path):
+    with open(path, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error):
+            raise SnapshotError('%s is not a snapshot' % path)
+    if len(buf) < HEADER.size:
+        raise SnapshotError('%s is not a snapshot' % path)
+    magic, version, revision, index_offset = HEADER.unpack(
+        buf[:HEADER.size])
+    if magic != MAGIC or not index_offset:
+        raise SnapshotError('%s is not a snapshot' % path)
+    if version != VERSION:
+        raise SnapshotError('unsupported snapshot version %d' % version)
+    try:
+        index = marshal.loads(buf[index_offset:])
+    except (EOFError, ValueError, TypeError):
+        raise SnapshotError('%s is truncated' % path)
+    sources = dict(
+        (resource, (count, section_loader(buf, offset, length)))
+        for resource, (offset, length, count) in index.iteritems())
+    return revision, sources
+
+
+def restore(store, resources, path):
+    revision, sources = open_snapshot(path)
+    objects = dict((resource, count)
+                   for resource, (count, _) in sources.iteritems())
+    for resource in resources:
+        sources.setdefault(resource, (0, list))
+    return {
+        'resourceVersion': str(store.restore(sources, revision, path)),
+        'objects': objects
+    }
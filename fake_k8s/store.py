@@ -0,0 +1,1276 @@
+# coding=UTF-8
+import bisect
+import columns
+import events
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import utils
+import wal
+from collections import OrderedDict
+from contextlib import contextmanager
+from flask import current_app as app
+from flask_cache import Cache
+
+
+class Conflict(Exception):
+    pass
+
+
+class AlreadyExists(Exception):
+    pass
+
+
+def object_key(obj):
+    return (obj['metadata'].get('namespace'), obj['metadata']['name'])
+
+
+def index_keys(obj):
+    metadata = obj['metadata']
+    keys = [('namespace', metadata.get('namespace'))]
+    for key, value in (metadata.get('labels') or {}).iteritems():
+        keys.append(('label', key, value))
+        keys.append(('label_key', key))
+    for ref in metadata.get('ownerReferences') or []:
+        keys.append(('owner', ref['kind'], ref['name']))
+    return keys
+
+
+def rollback(history):
+    changes = {}
+    present = {}
+    for event in history:
+        present[object_key(event.obj)] = event.type != events.DELETED
+        if event.type == events.MODIFIED and \
+                object_key(event.old) != object_key(event.obj):
+            present[object_key(event.old)] = False
+    for event in reversed(history):
+        changes[object_key(event.obj)] = None
+        if event.type != events.ADDED:
+            changes[object_key(event.old)] = event.old
+    return changes, present
+
+
+def paginate(current, changes, selectors, limit, start=None, namespace=None):
+    extras = sorted(
+        key for key, obj in changes.iteritems()
+        if obj is not None and (namespace is None or key[0] == namespace) and
+        (start is None or key > start))
+    items = []
+    last = start
+    previous = None
+    for key, _, obj in heapq.merge(
+            ((key, 0, changes[key]) for key in extras), current):
+        if key == previous:
+            continue
+        previous = key
+        if namespace is not None and key[0] != namespace:
+            break
+        if key in changes:
+            obj = changes[key]
+        if obj is None or not all(selector(obj) for selector in selectors):
+            continue
+        if len(items) == limit:
+            return items, last, True
+        items.append(obj)
+        last = key
+    return items, last, False
+
+
+def remaining_count(count, changes, present, last, namespace=None):
+    for key, obj in changes.iteritems():
+        if key > last and (namespace is None or key[0] == namespace):
+            count += (obj is not None) - present[key]
+    return count
+
+
+class FilesystemPersistence(object):
+    def __init__(self, config):
+        self.config = config
+        self._cache = None
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = Cache(app, config=self.config)
+        return self._cache
+
+    @classmethod
+    def from_config(cls, config, cache_config):
+        return cls(cache_config)
+
+    def bind(self, store):
+        return 0
+
+    def load(self, resource):
+        return self.cache.get(resource) or []
+
+    def save(self, resource, objects, changes=None):
+        self.cache.set(resource, objects.values())
+
+    def restore(self, sources, revision, path=None):
+        for resource, (count, load) in sources.iteritems():
+            self.cache.set(resource, load())
+
+
+class Collection(object):
+    def __init__(self, columns=None):
+        self.columns = columns
+        self.objects = OrderedDict()
+        self.keys = []
+        self.indexes = {}
+        self.index_keys = {}
+        self.sequence = {}
+        self._counter = itertools.count()
+
+    def add(self, key, obj):
+        old = self.objects.get(key)
+        if old is not None:
+            self._unindex(key)
+        else:
+            self.sequence[key] = next(self._counter)
+            bisect.insort(self.keys, key)
+        self._index(key, obj, old)
+
+    def add_many(self, objs):
+        keys = []
+        for obj in objs:
+            key = object_key(obj)
+            if key in self.objects:
+                self.add(key, obj)
+                continue
+            self.sequence[key] = next(self._counter)
+            keys.append(key)
+            self._index(key, obj)
+        self.keys = sorted(self.keys + keys)
+
+    def _index(self, key, obj, old=None):
+        self.objects[key] = obj
+        if self.columns is not None:
+            self.columns.add(key, obj, old)
+        keys = index_keys(obj)
+        self.index_keys[key] = keys
+        for index_key in keys:
+            self.indexes.setdefault(index_key, set()).add(key)
+
+    def remove(self, key):
+        obj = self.objects.pop(key, None)
+        if obj is not None:
+            self._unindex(key)
+            del self.sequence[key]
+            del self.keys[bisect.bisect_left(self.keys, key)]
+            if self.columns is not None:
+                self.columns.remove(key, obj)
+                if self.columns.dead > 1024 and \
+                        self.columns.dead * 2 > self.columns.size:
+                    self.columns.rebuild(self.objects)
+        return obj
+
+    def _unindex(self, key):
+        for index_key in self.index_keys.pop(key):
+            postings = self.indexes[index_key]
+            postings.discard(key)
+            if not postings:
+                del self.indexes[index_key]
+
+    def select(self, postings):
+        empty = frozenset()
+        groups = [[self.indexes.get(index_key, empty) for index_key in keys]
+                  for keys in postings]
+        groups.sort(key=lambda group: sum(len(keys) for keys in group))
+        candidates = set().union(*groups[0])
+        for group in groups[1:]:
+            candidates = [key for key in candidates
+                          if any(key in keys for keys in group)]
+        return [self.objects[key]
+                for key in sorted(candidates, key=self.sequence.get)]
+
+
+class MemoryStore(object):
+    """Objects returned by reads are the stored dicts, shared with the
+    indexes and the watch history; copy them before making changes."""
+
+    def __init__(self, persistence=None, watch_history_size=1000,
+                 columnar_index=False):
+        self.persistence = persistence
+        self.interner = columns.Interner() if columnar_index else None
+        self.events = events.EventBus(watch_history_size)
+        self.revision = 0
+        self._lock = threading.RLock()
+        self._resources = {}
+        self._sources = {}
+        if persistence:
+            self.revision = persistence.bind(self)
+
+    @classmethod
+    def from_config(cls, config, cache_config):
+        persistence = None
+        if config.get('STORE_PERSISTENCE'):
+            persistence = PERSISTENCE_TYPES[
+                config['STORE_PERSISTENCE']].from_config(config, cache_config)
+        return cls(persistence=persistence,
+                   watch_history_size=config['WATCH_HISTORY_SIZE'],
+                   columnar_index=config.get('COLUMNAR_INDEX', False))
+
+    def _new_collection(self):
+        return Collection(columns.create_index(self.interner)
+                          if self.interner else None)
+
+    def _collection(self, resource):
+        collection = self._resources.get(resource)
+        if collection is None:
+            with self._lock:
+                collection = self._resources.get(resource)
+                if collection is None:
+                    collection = self._new_collection()
+                    source = self._sources.pop(resource, None)
+                    if source is not None:
+                        with utils.gc_paused():
+                            collection.add_many(source[1]())
+                    elif self.persistence:
+                        with utils.gc_paused():
+                            collection.add_many(
+                                self.persistence.load(resource))
+                        for obj in collection.objects.itervalues():
+                            self.revision = max(self.revision, int(
+                                obj['metadata'].get('resourceVersion', 0)))
+                        self.events.compact(resource, self.revision)
+                    self._resources[resource] = collection
+        return collection
+
+    def _stamp(self, obj):
+        self.revision += 1
+        obj['metadata']['resourceVersion'] = str(self.revision)
+        return self.revision
+
+    def _persist(self, resource, changes=None):
+        if self.persistence:
+            return self.persistence.save(
+                resource, self._resources[resource].objects, changes)
+
+    def _commit(self, ticket):
+        if ticket is not None:
+            self.persistence.wait(ticket)
+
+    def get(self, resource, namespace, name):
+        return self._collection(resource).objects.get((namespace, name))
+
+    def sizes(self):
+        sizes = dict((resource, count) for resource, (count, _) in
+                     self._sources.items())
+        sizes.update((resource, len(collection.objects)) for resource,
+                     collection in self._resources.items())
+        return sizes
+
+    def export(self, resources):
+        with self._lock:
+            resources = set(resources) | set(self._resources) | \
+                set(self._sources)
+            return self.revision, dict(
+                (resource, self.list(resource)) for resource in resources)
+
+    def restore(self, sources, revision, path=None):
+        with self._lock:
+            self._resources = {}
+            self._sources = {}
+            for resource, (count, load) in sources.iteritems():
+                if count:
+                    self._sources[resource] = (count, load)
+                else:
+                    self._resources[resource] = self._new_collection()
+            revision = self.revision = max(self.revision, revision) + 1
+            ticket = None
+            if self.persistence:
+                ticket = self.persistence.restore(sources, revision, path)
+            self.events.reset(revision)
+        self._commit(ticket)
+        return revision
+
+    def list(self, resource):
+        collection = self._collection(resource)
+        with self._lock:
+            return collection.objects.values()
+
+    def query(self, resource, selectors=()):
+        collection = self._collection(resource)
+        filters = [selector.column_filter for selector in selectors]
+        if collection.columns is not None and filters and \
+                None not in filters:
+            with self._lock:
+                return [collection.objects[key]
+                        for key in collection.columns.select(filters)]
+        postings = []
+        predicates = []
+        for selector in selectors:
+            keys = selector.index_keys
+            if keys is None:
+                predicates.append(selector)
+            else:
+                postings.append(keys)
+        with self._lock:
+            if postings:
+                objects = collection.select(postings)
+            else:
+                objects = collection.objects.values()
+        return [obj for obj in objects
+                if all(predicate(obj) for predicate in predicates)]
+
+    def snapshot(self, resource, selectors=(), revision=None):
+        with self._lock:
+            if revision is None or revision >= self.revision:
+                return self.revision, self.query(resource, selectors)
+            objects = OrderedDict(
+                (object_key(obj), obj) for obj in self.list(resource))
+            for event in reversed(self.events.since(resource, revision)):
+                objects.pop(object_key(event.obj), None)
+                if event.type != events.ADDED:
+                    objects[object_key(event.old)] = event.old
+        return revision, [obj for obj in objects.values()
+                          if all(selector(obj) for selector in selectors)]
+
+    def page(self, resource, selectors, limit, start=None, revision=None,
+             namespace=None):
+        collection = self._collection(resource)
+        with self._lock:
+            keys = collection.keys
+            if revision is None:
+                revision = self.revision
+            changes, present = {}, {}
+            if revision < self.revision:
+                changes, present = rollback(
+                    self.events.since(resource, revision))
+            first = 0 if namespace is None else \
+                bisect.bisect_left(keys, (namespace,))
+            position = first if start is None else \
+                bisect.bisect_right(keys, start)
+            current = ((keys[i], 1, collection.objects[keys[i]])
+                       for i in xrange(position, len(keys)))
+            items, last, more = paginate(current, changes, selectors, limit,
+                                         start, namespace)
+            remaining = None
+            if more and not selectors:
+                count = len(collection.objects) if namespace is None \
+                    else len(collection.indexes.get(('namespace', namespace),
+                                                    ()))
+                count -= bisect.bisect_right(keys, last) - first
+                remaining = remaining_count(count, changes, present, last,
+                                            namespace)
+        return revision, items, last if more else None, remaining
+
+    def watch(self, resource, selectors, timeout, revision=None):
+        with self._lock:
+            if revision is None:
+                revision = self.revision
+                objects = self.query(resource, selectors)
+            else:
+                objects = []
+        return events.stream(
+            objects, self.events.follow(resource, revision, timeout),
+            selectors)
+
+    def create(self, resource, obj):
+        collection = self._collection(resource)
+        with self._lock:
+            if object_key(obj) in collection.objects:
+                raise AlreadyExists('%s "%s" already exists' %
+                                    (resource, obj['metadata']['name']))
+            revision = self._stamp(obj)
+            collection.add(object_key(obj), obj)
+            ticket = self._persist(resource, [
+                (revision, events.ADDED, object_key(obj), obj)])
+            self.events.publish(resource, revision, events.ADDED, obj)
+        self._commit(ticket)
+        return obj
+
+    def create_many(self, resource, objs):
+        collection = self._collection(resource)
+        with self._lock:
+            keys = set()
+            for obj in objs:
+                key = object_key(obj)
+                if key in collection.objects or key in keys:
+                    raise AlreadyExists('%s "%s" already exists' %
+                                        (resource, obj['metadata']['name']))
+                keys.add(key)
+            revisions = []
+            for obj in objs:
+                revisions.append(self._stamp(obj))
+                collection.add(object_key(obj), obj)
+            ticket = self._persist(resource, [
+                (revision, events.ADDED, object_key(obj), obj)
+                for revision, obj in zip(revisions, objs)])
+            for revision, obj in zip(revisions, objs):
+                self.events.publish(resource, revision, events.ADDED, obj)
+        self._commit(ticket)
+        return objs
+
+    def bulk_create(self, batches):
+        collections = [(resource, self._collection(resource), objs)
+                       for resource, objs in batches]
+        with self._lock:
+            for resource, collection, objs in collections:
+                for obj in objs:
+                    if object_key(obj) in collection.objects:
+                        raise AlreadyExists(
+                            '%s "%s" already exists' %
+                            (resource, obj['metadata']['name']))
+            created = []
+            tickets = []
+            for resource, collection, objs in collections:
+                changes = []
+                for obj in objs:
+                    revision = self._stamp(obj)
+                    created.append((resource, revision, obj))
+                    changes.append((revision, events.ADDED, object_key(obj),
+                                    obj))
+                collection.add_many(objs)
+                tickets.append(self._persist(resource, changes))
+            for resource, revision, obj in created:
+                self.events.publish(resource, revision, events.ADDED, obj)
+            revision = self.revision
+        for ticket in tickets:
+            self._commit(ticket)
+        return revision
+
+    def update(self, resource, namespace, name, obj, resource_version=None):
+        collection = self._collection(resource)
+        with self._lock:
+            old = collection.objects.get((namespace, name))
+            if old is None:
+                return None
+            if resource_version and \
+                    old['metadata'].get('resourceVersion') != resource_version:
+                raise Conflict('the object has been modified; please apply '
+                               'your changes to the latest version and try '
+                               'again')
+            revision = self._stamp(obj)
+            key = object_key(obj)
+            if key != (namespace, name):
+                collection.remove((namespace, name))
+            collection.add(key, obj)
+            ticket = self._persist(resource, [
+                (revision, events.MODIFIED, (namespace, name), obj)])
+            self.events.publish(resource, revision, events.MODIFIED, obj, old)
+        self._commit(ticket)
+        return obj
+
+    def delete(self, resource, namespace, name):
+        collection = self._collection(resource)
+        with self._lock:
+            old = collection.remove((namespace, name))
+            if old is None:
+                return None
+            obj = dict(old, metadata=dict(old['metadata']))
+            revision = self._stamp(obj)
+            ticket = self._persist(resource, [
+                (revision, events.DELETED, (namespace, name), None)])
+            self.events.publish(resource, revision, events.DELETED, obj, old)
+        self._commit(ticket)
+        return obj
+
+
+class SQLiteEventBus(events.EventBus):
+    def __init__(self, store, history_size, tick=1):
+        super(SQLiteEventBus, self).__init__(history_size, tick)
+        self.store = store
+
+    def publish(self, resource, revision, event_type, obj, old=None):
+        condition = self._condition(resource)
+        with condition:
+            self.revision = revision
+            condition.notify_all()
+
+    def compact(self, resource, revision):
+        pass
+
+    def since(self, resource, revision):
+        with self.store.connection() as connection:
+            return self.store.events_since(connection, resource, revision)
+
+    def follow(self, resource, revision, timeout):
+        deadline = time.time() + timeout
+        condition = self._condition(resource)
+        with condition:
+            self._start_ticker()
+        while True:
+            seen = self.revision, self.generation
+            events = self.since(resource, revision)
+            if events:
+                revision = events[-1].revision
+                for event in events:
+                    yield event
+                continue
+            with condition:
+                while (self.revision, self.generation) == seen:
+                    if time.time() >= deadline:
+                        return
+                    condition.wait()
+
+
+class SQLiteStore(object):
+    schema = [
+        '''CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS resources (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )''',
+        '''CREATE TABLE IF NOT EXISTS events (
+            revision INTEGER PRIMARY KEY,
+            resource TEXT NOT NULL,
+            type TEXT NOT NULL,
+            object TEXT NOT NULL,
+            old TEXT
+        )''',
+        '''CREATE INDEX IF NOT EXISTS events_resource
+            ON events (resource, revision)''',
+        '''CREATE TABLE IF NOT EXISTS compactions (
+            resource TEXT PRIMARY KEY,
+            revision INTEGER NOT NULL
+        )''',
+        "INSERT OR IGNORE INTO meta VALUES ('revision', 0)"
+    ]
+    resource_schema = [
+        '''CREATE TABLE IF NOT EXISTS r{0} (
+            id INTEGER PRIMARY KEY,
+            namespace TEXT NOT NULL,
+            name TEXT NOT NULL,
+            body TEXT NOT NULL,
+            UNIQUE (namespace, name)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS r{0}_labels (
+            id INTEGER NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT
+        )''',
+        '''CREATE INDEX IF NOT EXISTS r{0}_labels_key
+            ON r{0}_labels (key, value, id)''',
+        '''CREATE INDEX IF NOT EXISTS r{0}_labels_id ON r{0}_labels (id)''',
+        '''CREATE TABLE IF NOT EXISTS r{0}_owners (
+            id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL
+        )''',
+        '''CREATE INDEX IF NOT EXISTS r{0}_owners_name
+            ON r{0}_owners (kind, name, id)''',
+        '''CREATE INDEX IF NOT EXISTS r{0}_owners_id ON r{0}_owners (id)'''
+    ]
+
+    def __init__(self, path=None, cache_config=None, watch_history_size=1000):
+        self.path = path
+        self.cache_config = cache_config
+        self.history_size = watch_history_size
+        self.events = SQLiteEventBus(self, watch_history_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pool = []
+        self._pid = None
+        self._tables = {}
+
+    @classmethod
+    def from_config(cls, config, cache_config):
+        return cls(path=config.get('SQLITE_PATH'), cache_config=cache_config,
+                   watch_history_size=config['WATCH_HISTORY_SIZE'])
+
+    def _open(self):
+        path = self.path or os.path.join(self.cache_config['CACHE_DIR'],
+                                         'fake_k8s.db')
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                     check_same_thread=False,
+                                     cached_statements=512)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                connection = self._open()
+                for statement in self.schema:
+                    connection.execute(statement)
+                self._pool = []
+                self._pid = os.getpid()
+                return connection
+            if self._pool:
+                return self._pool.pop()
+        return self._open()
+
+    def _release(self, connection):
+        with self._lock:
+            if self._pid == os.getpid():
+                self._pool.append(connection)
+                return
+        connection.close()
+
+    @contextmanager
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            yield connection
+            return
+        connection = self._local.connection = self._acquire()
+        try:
+            yield connection
+        finally:
+            self._local.connection = None
+            self._release(connection)
+
+    def _table(self, resource):
+        table = self._tables.get(resource)
+        if table is None:
+            with self.connection() as connection:
+                connection.execute('INSERT OR IGNORE INTO resources (name) '
+                                   'VALUES (?)', (resource,))
+                table = 'r%d' % connection.execute(
+                    'SELECT id FROM resources WHERE name = ?',
+                    (resource,)).fetchone()[0]
+                for statement in self.resource_schema:
+                    connection.execute(statement.format(table[1:]))
+            self._tables[resource] = table
+        return table
+
+    @contextmanager
+    def _transaction(self, write=False):
+        with self.connection() as connection:
+            connection.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+    @staticmethod
+    def _key(obj):
+        return (obj['metadata'].get('namespace') or '',
+                obj['metadata']['name'])
+
+    @staticmethod
+    def _revision(connection):
+        return connection.execute(
+            "SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    @property
+    def revision(self):
+        with self.connection() as connection:
+            return self._revision(connection)
+
+    def _stamp(self, connection, objs):
+        connection.execute("UPDATE meta SET value = value + ? "
+                           "WHERE key = 'revision'", (len(objs),))
+        revision = self._revision(connection) - len(objs)
+        revisions = []
+        for obj in objs:
+            revision += 1
+            obj['metadata']['resourceVersion'] = str(revision)
+            revisions.append(revision)
+        return revisions
+
+    def _record(self, connection, resource, revision, event_type, obj,
+                old=None):
+        connection.execute(
+            'INSERT INTO events VALUES (?, ?, ?, ?, ?)',
+            (revision, resource, event_type, json.dumps(obj),
+             None if old is None else json.dumps(old)))
+
+    def _trim(self, connection, resource):
+        row = connection.execute(
+            'SELECT revision FROM events WHERE resource = ? '
+            'ORDER BY revision DESC LIMIT 1 OFFSET ?',
+            (resource, self.history_size)).fetchone()
+        if row:
+            connection.execute(
+                'DELETE FROM events WHERE resource = ? AND revision <= ?',
+                (resource, row[0]))
+            connection.execute(
+                'INSERT OR REPLACE INTO compactions VALUES (?, ?)',
+                (resource, row[0]))
+
+    def events_since(self, connection, resource, revision):
+        row = connection.execute(
+            'SELECT revision FROM compactions WHERE resource = ?',
+            (resource,)).fetchone()
+        if row and revision < row[0]:
+            raise events.Expired('too old resource version: %d (%d)' %
+                                 (revision, row[0]))
+        return [events.Event(rev, event_type, json.loads(obj),
+                             old and json.loads(old))
+                for rev, event_type, obj, old in connection.execute(
+                    'SELECT revision, type, object, old FROM events '
+                    'WHERE resource = ? AND revision > ? ORDER BY revision',
+                    (resource, revision))]
+
+    def _notify(self, resource, revisions):
+        if revisions:
+            self.events.publish(resource, revisions[-1], None, None)
+
+    def _where(self, table, selectors):
+        clauses = []
+        params = []
+        predicates = []
+        for selector in selectors:
+            column_filter = selector.column_filter
+            owners = [key for key in selector.index_keys or []
+                      if key[0] == 'owner']
+            if column_filter is not None and column_filter[0][0] == 'label':
+                (_, key), values, negate = column_filter
+                subquery = 'SELECT id FROM %s_labels WHERE key = ?' % table
+                params.append(key)
+                if values is not None:
+                    subquery += ' AND value IN (%s)' % \
+                        ', '.join('?' * len(values))
+                    params.extend(values)
+                clauses.append('id %sIN (%s)' %
+                               ('NOT ' if negate else '', subquery))
+            elif column_filter is not None and \
+                    column_filter[0][1] == ('metadata', 'namespace'):
+                _, values, negate = column_filter
+                clauses.append('namespace %s ?' % ('!=' if negate else '='))
+                params.append(values[0])
+            elif owners:
+                clauses.append('id IN (SELECT id FROM %s_owners WHERE %s)' % (
+                    table, ' OR '.join(['(kind = ? AND name = ?)'] *
+                                       len(owners))))
+                for _, kind, name in owners:
+                    params.extend([kind, name])
+            else:
+                predicates.append(selector)
+        return clauses, params, predicates
+
+    def _select(self, connection, table, selectors=()):
+        clauses, params, predicates = self._where(table, selectors)
+        rows = connection.execute(
+            'SELECT body FROM %s %s ORDER BY id' % (
+                table, 'WHERE ' + ' AND '.join(clauses) if clauses else ''),
+            params)
+        return [obj for obj in (json.loads(body) for body, in rows)
+                if all(predicate(obj) for predicate in predicates)]
+
+    def get(self, resource, namespace, name):
+        table = self._table(resource)
+        with self.connection() as connection:
+            row = connection.execute(
+                'SELECT body FROM %s WHERE namespace = ? AND name = ?' %
+                table, (namespace or '', name)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _resources(self):
+        with self.connection() as connection:
+            return [resource for resource, in connection.execute(
+                'SELECT name FROM resources').fetchall()]
+
+    def sizes(self):
+        with self.connection() as connection:
+            return dict(
+                (resource, connection.execute(
+                    'SELECT COUNT(*) FROM %s' % self._table(resource)
+                ).fetchone()[0])
+                for resource in self._resources())
+
+    def export(self, resources):
+        resources = set(resources) | set(self._resources())
+        tables = [(resource, self._table(resource)) for resource in resources]
+        with self._transaction() as connection:
+            return self._revision(connection), dict(
+                (resource, self._select(connection, table))
+                for resource, table in tables)
+
+    def restore(self, sources, revision, path=None):
+        resources = set(sources) | set(self._resources())
+        tables = [(resource, self._table(resource)) for resource in resources]
+        with self._transaction(write=True) as connection:
+            for resource, table in tables:
+                for suffix in ['', '_labels', '_owners']:
+                    connection.execute('DELETE FROM %s%s' % (table, suffix))
+            connection.execute('DELETE FROM events')
+            connection.execute(
+                "UPDATE meta SET value = MAX(value, ?) + 1 "
+                "WHERE key = 'revision'",
+                (revision,))
+            revision = self._revision(connection)
+            for resource, table in tables:
+                if resource in sources:
+                    for obj in sources[resource][1]():
+                        self._insert(connection, table, resource, obj)
+                connection.execute(
+                    'INSERT OR REPLACE INTO compactions VALUES (?, ?)',
+                    (resource, revision))
+        self.events.reset(revision)
+        return revision
+
+    def list(self, resource):
+        return self.query(resource)
+
+    def query(self, resource, selectors=()):
+        table = self._table(resource)
+        with self.connection() as connection:
+            return self._select(connection, table, selectors)
+
+    def snapshot(self, resource, selectors=(), revision=None):
+        table = self._table(resource)
+        with self._transaction() as connection:
+            current = self._revision(connection)
+            if revision is None or revision >= current:
+                return current, self._select(connection, table, selectors)
+            objects = OrderedDict((object_key(obj), obj)
+                                  for obj in self._select(connection, table))
+            for event in reversed(self.events_since(connection, resource,
+                                                    revision)):
+                objects.pop(object_key(event.obj), None)
+                if event.type != events.ADDED:
+                    objects[object_key(event.old)] = event.old
+        return revision, [obj for obj in objects.values()
+                          if all(selector(obj) for selector in selectors)]
+
+    def page(self, resource, selectors, limit, start=None, revision=None,
+             namespace=None):
+        table = self._table(resource)
+        with self._transaction() as connection:
+            current = self._revision(connection)
+            if revision is None:
+                revision = current
+            changes, present = {}, {}
+            if revision < current:
+                changes, present = rollback(
+                    self.events_since(connection, resource, revision))
+            clauses, params, _ = self._where(table, selectors)
+            if namespace is not None:
+                clauses.append('namespace = ?')
+                params.append(namespace)
+            if start is not None:
+                clauses.append('(namespace, name) > (?, ?)')
+                params.extend([start[0] or '', start[1]])
+            rows = connection.execute(
+                'SELECT namespace, name, body FROM %s %s '
+                'ORDER BY namespace, name' % (
+                    table,
+                    'WHERE ' + ' AND '.join(clauses) if clauses else ''),
+                params)
+            items, last, more = paginate(
+                (((ns or None, name), 1, json.loads(body))
+                 for ns, name, body in rows),
+                changes, selectors, limit, start, namespace)
+            remaining = None
+            if more and not selectors:
+                clauses = ['(namespace, name) > (?, ?)']
+                params = [last[0] or '', last[1]]
+                if namespace is not None:
+                    clauses.append('namespace = ?')
+                    params.append(namespace)
+                count = connection.execute(
+                    'SELECT COUNT(*) FROM %s WHERE %s' % (
+                        table, ' AND '.join(clauses)), params).fetchone()[0]
+                remaining = remaining_count(count, changes, present, last,
+                                            namespace)
+        return revision, items, last if more else None, remaining
+
+    def watch(self, resource, selectors, timeout, revision=None):
+        if revision is None:
+            table = self._table(resource)
+            with self._transaction() as connection:
+                revision = self._revision(connection)
+                objects = self._select(connection, table, selectors)
+        else:
+            objects = []
+        return events.stream(
+            objects, self.events.follow(resource, revision, timeout),
+            selectors)
+
+    def _index(self, connection, table, row_id, obj):
+        metadata = obj['metadata']
+        connection.executemany(
+            'INSERT INTO %s_labels VALUES (?, ?, ?)' % table,
+            [(row_id, key, value)
+             for key, value in (metadata.get('labels') or {}).iteritems()])
+        connection.executemany(
+            'INSERT INTO %s_owners VALUES (?, ?, ?)' % table,
+            [(row_id, ref['kind'], ref['name'])
+             for ref in metadata.get('ownerReferences') or []])
+
+    def _unindex(self, connection, table, row_id):
+        connection.execute('DELETE FROM %s_labels WHERE id = ?' % table,
+                           (row_id,))
+        connection.execute('DELETE FROM %s_owners WHERE id = ?' % table,
+                           (row_id,))
+
+    def _insert(self, connection, table, resource, obj):
+        try:
+            row_id = connection.execute(
+                'INSERT INTO %s (namespace, name, body) VALUES (?, ?, ?)' %
+                table, self._key(obj) + (json.dumps(obj),)).lastrowid
+        except sqlite3.IntegrityError:
+            raise AlreadyExists('%s "%s" already exists' %
+                                (resource, obj['metadata']['name']))
+        self._index(connection, table, row_id, obj)
+
+    def _fetch(self, connection, table, namespace, name):
+        row = connection.execute(
+            'SELECT id, body FROM %s WHERE namespace = ? AND name = ?' %
+            table, (namespace or '', name)).fetchone()
+        if row:
+            return row[0], json.loads(row[1])
+        return None, None
+
+    def _remove(self, connection, table, row_id):
+        connection.execute('DELETE FROM %s WHERE id = ?' % table, (row_id,))
+        self._unindex(connection, table, row_id)
+
+    def create(self, resource, obj):
+        return self.create_many(resource, [obj])[0]
+
+    def create_many(self, resource, objs):
+        table = self._table(resource)
+        with self._transaction(write=True) as connection:
+            revisions = self._stamp(connection, objs)
+            for revision, obj in zip(revisions, objs):
+                self._insert(connection, table, resource, obj)
+                self._record(connection, resource, revision, events.ADDED,
+                             obj)
+            self._trim(connection, resource)
+        self._notify(resource, revisions)
+        return objs
+
+    def bulk_create(self, batches):
+        tables = [(resource, self._table(resource), objs)
+                  for resource, objs in batches]
+        notifications = []
+        with self._transaction(write=True) as connection:
+            for resource, table, objs in tables:
+                revisions = self._stamp(connection, objs)
+                for revision, obj in zip(revisions, objs):
+                    self._insert(connection, table, resource, obj)
+                    self._record(connection, resource, revision,
+                                 events.ADDED, obj)
+                self._trim(connection, resource)
+                notifications.append((resource, revisions))
+            revision = self._revision(connection)
+        for resource, revisions in notifications:
+            self._notify(resource, revisions)
+        return revision
+
+    def update(self, resource, namespace, name, obj, resource_version=None):
+        table = self._table(resource)
+        with self._transaction(write=True) as connection:
+            row_id, old = self._fetch(connection, table, namespace, name)
+            if old is None:
+                return None
+            if resource_version and \
+                    old['metadata'].get('resourceVersion') != resource_version:
+                raise Conflict('the object has been modified; please apply '
+                               'your changes to the latest version and try '
+                               'again')
+            revisions = self._stamp(connection, [obj])
+            if self._key(obj) != (namespace or '', name):
+                self._remove(connection, table, row_id)
+                self._insert(connection, table, resource, obj)
+            else:
+                connection.execute('UPDATE %s SET body = ? WHERE id = ?' %
+                                   table, (json.dumps(obj), row_id))
+                self._unindex(connection, table, row_id)
+                self._index(connection, table, row_id, obj)
+            self._record(connection, resource, revisions[0], events.MODIFIED,
+                         obj, old)
+            self._trim(connection, resource)
+        self._notify(resource, revisions)
+        return obj
+
+    def delete(self, resource, namespace, name):
+        table = self._table(resource)
+        with self._transaction(write=True) as connection:
+            row_id, old = self._fetch(connection, table, namespace, name)
+            if old is None:
+                return None
+            obj = dict(old, metadata=dict(old['metadata']))
+            revisions = self._stamp(connection, [obj])
+            self._remove(connection, table, row_id)
+            self._record(connection, resource, revisions[0], events.DELETED,
+                         obj, old)
+            self._trim(connection, resource)
+        self._notify(resource, revisions)
+        return obj
+
+
+class ForkStore(MemoryStore):
+    def __init__(self, base):
+        super(ForkStore, self).__init__(
+            watch_history_size=base.events.history_size)
+        self.base = base
+        self.revision = base.revision
+        self.events.reset(self.revision)
+        self._hidden = {}
+        self._detached = set()
+
+    def _unhide(self, resource, keys):
+        hidden = self._hidden.get(resource)
+        if hidden:
+            hidden.difference_update(keys)
+
+    def _copy(self, resource, namespace, name):
+        collection = self._collection(resource)
+        if (namespace, name) in collection.objects:
+            return True
+        obj = self.get(resource, namespace, name)
+        if obj is not None:
+            collection.add((namespace, name), obj)
+        return obj is not None
+
+    def preserve(self, resource, keys):
+        with self._lock:
+            if resource in self._detached:
+                return
+            collection = self._collection(resource)
+            hidden = self._hidden.setdefault(resource, set())
+            for key in keys:
+                if key in collection.objects or key in hidden:
+                    continue
+                obj = self.base.get(resource, *key)
+                if obj is None:
+                    hidden.add(key)
+                else:
+                    collection.add(key, obj)
+
+    def get(self, resource, namespace, name):
+        with self._lock:
+            obj = self._collection(resource).objects.get((namespace, name))
+            if obj is not None or resource in self._detached or \
+                    (namespace, name) in self._hidden.get(resource, ()):
+                return obj
+            return self.base.get(resource, namespace, name)
+
+    def sizes(self):
+        resources = set(self.base.sizes()) | set(self._resources) | \
+            set(self._sources)
+        return dict((resource, len(self.list(resource)))
+                    for resource in resources)
+
+    def list(self, resource):
+        return self.query(resource)
+
+    def query(self, resource, selectors=()):
+        with self._lock:
+            objects = super(ForkStore, self).query(resource, selectors)
+            if resource in self._detached:
+                return objects
+            overlay = self._collection(resource).objects
+            hidden = self._hidden.get(resource, ())
+            matched = OrderedDict((object_key(obj), obj) for obj in objects)
+            merged = []
+            for obj in self.base.query(resource, selectors):
+                key = object_key(obj)
+                if key in overlay:
+                    if key in matched:
+                        merged.append(matched.pop(key))
+                elif key not in hidden:
+                    merged.append(obj)
+            return merged + matched.values()
+
+    def page(self, resource, selectors, limit, start=None, revision=None,
+             namespace=None):
+        if resource in self._detached:
+            return super(ForkStore, self).page(
+                resource, selectors, limit, start, revision, namespace)
+        with self._lock:
+            if revision is None:
+                revision = self.revision
+            changes = dict.fromkeys(self._hidden.get(resource, ()))
+            changes.update(self._collection(resource).objects)
+            if revision < self.revision:
+                changes.update(rollback(
+                    self.events.since(resource, revision))[0])
+            _, items, last, _ = self.base.page(
+                resource, selectors, limit and limit + len(changes) + 1, start,
+                None, namespace)
+            items, last, more = paginate(
+                ((object_key(obj), 1, obj) for obj in items), changes,
+                selectors, limit, start, namespace)
+        return revision, items, last if more else None, None
+
+    def create(self, resource, obj):
+        with self._lock:
+            if self.get(resource, *object_key(obj)) is not None:
+                raise AlreadyExists('%s "%s" already exists' %
+                                    (resource, obj['metadata']['name']))
+            self._unhide(resource, [object_key(obj)])
+            return super(ForkStore, self).create(resource, obj)
+
+    def create_many(self, resource, objs):
+        with self._lock:
+            keys = set()
+            for obj in objs:
+                key = object_key(obj)
+                if key in keys or self.get(resource, *key) is not None:
+                    raise AlreadyExists('%s "%s" already exists' %
+                                        (resource, obj['metadata']['name']))
+                keys.add(key)
+            self._unhide(resource, keys)
+            return super(ForkStore, self).create_many(resource, objs)
+
+    def bulk_create(self, batches):
+        with self._lock:
+            for resource, objs in batches:
+                for obj in objs:
+                    if self.get(resource, *object_key(obj)) is not None:
+                        raise AlreadyExists(
+                            '%s "%s" already exists' %
+                            (resource, obj['metadata']['name']))
+            for resource, objs in batches:
+                self._unhide(resource, [object_key(obj) for obj in objs])
+            return super(ForkStore, self).bulk_create(batches)
+
+    def update(self, resource, namespace, name, obj, resource_version=None):
+        with self._lock:
+            if not self._copy(resource, namespace, name):
+                return None
+            obj = super(ForkStore, self).update(
+                resource, namespace, name, obj, resource_version)
+            if object_key(obj) != (namespace, name) and \
+                    resource not in self._detached:
+                self._hidden.setdefault(resource, set()).add(
+                    (namespace, name))
+            self._unhide(resource, [object_key(obj)])
+            return obj
+
+    def delete(self, resource, namespace, name):
+        with self._lock:
+            if not self._copy(resource, namespace, name):
+                return None
+            obj = super(ForkStore, self).delete(resource, namespace, name)
+            if resource not in self._detached:
+                self._hidden.setdefault(resource, set()).add(
+                    (namespace, name))
+            return obj
+
+    def restore(self, sources, revision, path=None):
+        with self._lock:
+            self._hidden = {}
+            self._detached = set(sources)
+            return super(ForkStore, self).restore(sources, revision, path)
+
+
+class ForkedStore(object):
+    def __init__(self, store):
+        self.root = store
+        self.forks = OrderedDict()
+        self.parents = {}
+        self._children = {}
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        return getattr(self.view(), name)
+
+    def view(self):
+        return getattr(self._local, 'fork', None) or self.root
+
+    def select(self, name=None):
+        self._local.fork = self.forks[name] if name else None
+
+    def fork(self, name, parent=None):
+        with self._lock:
+            if name in self.forks:
+                raise AlreadyExists('fork "%s" already exists' % name)
+            base = self.forks[parent] if parent else self.root
+            fork = self.forks[name] = ForkStore(base)
+            self.parents[name] = parent
+            self._children.setdefault(base, []).append(fork)
+        return fork
+
+    def drop(self, name):
+        with self._lock:
+            if self._children.get(self.forks[name]):
+                raise Conflict('fork "%s" has forks of its own' % name)
+            fork = self.forks.pop(name)
+            del self.parents[name]
+            self._children.pop(fork, None)
+            siblings = self._children.get(fork.base)
+            if siblings is not None:
+                siblings.remove(fork)
+                if not siblings:
+                    del self._children[fork.base]
+        return fork
+
+    def _write(self, changes, method, *args):
+        view = self.view()
+        if not self._children.get(view):
+            return getattr(view, method)(*args)
+        with self._lock:
+            for fork in self._children.get(view, ()):
+                for resource, keys in changes:
+                    fork.preserve(resource, keys)
+            return getattr(view, method)(*args)
+
+    def get(self, resource, namespace, name):
+        return self.view().get(resource, namespace, name)
+
+    def list(self, resource):
+        return self.view().list(resource)
+
+    def query(self, resource, selectors=()):
+        return self.view().query(resource, selectors)
+
+    def snapshot(self, resource, selectors=(), revision=None):
+        return self.view().snapshot(resource, selectors, revision)
+
+    def page(self, resource, selectors, limit, start=None, revision=None,
+             namespace=None):
+        return self.view().page(resource, selectors, limit, start, revision,
+                                namespace)
+
+    def watch(self, resource, selectors, timeout, revision=None):
+        return self.view().watch(resource, selectors, timeout, revision)
+
+    def create(self, resource, obj):
+        return self._write([(resource, [object_key(obj)])], 'create',
+                           resource, obj)
+
+    def create_many(self, resource, objs):
+        return self._write([(resource, [object_key(obj) for obj in objs])],
+                           'create_many', resource, objs)
+
+    def bulk_create(self, batches):
+        return self._write(
+            [(resource, [object_key(obj) for obj in objs])
+             for resource, objs in batches], 'bulk_create', batches)
+
+    def update(self, resource, namespace, name, obj, resource_version=None):
+        return self._write([(resource, [(namespace, name), object_key(obj)])],
+                           'update', resource, namespace, name, obj,
+                           resource_version)
+
+    def delete(self, resource, namespace, name):
+        return self._write([(resource, [(namespace, name)])], 'delete',
+                           resource, namespace, name)
+
+    def restore(self, sources, revision, path=None):
+        view = self.view()
+        if self._children.get(view):
+            raise Conflict('cannot restore a snapshot over a cluster that '
+                           'has forks')
+        return view.restore(sources, revision, path)
+
+
+STORE_TYPES = {
+    'memory': MemoryStore,
+    'sqlite': SQLiteStore
+}
+
+PERSISTENCE_TYPES = {
+    'filesystem': FilesystemPersistence,
+    'wal': wal.WriteAheadLog
+}
+
+
+def create_store(config, cache_config):
+    store = STORE_TYPES[config['STORE_TYPE']].from_config(config, cache_config)
+    if config.get('FORKS'):
+        store = ForkedStore(store)
+    return store
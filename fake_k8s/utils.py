@@ -1,87 +1,174 @@
 # coding=UTF-8
-from jinja2 import Environment
+from collections import OrderedDict
+from contextlib import contextmanager
+from flask import json
+from functools import wraps
+from jinja2 import Environment, FileSystemBytecodeCache, FunctionLoader
+import columns
+import gc
 import string
 import random
 import re
+import threading
 
 
 CUSTOM_FILTERS = {}
+TEMPLATES = {}
+SELECTOR_CACHE_SIZE = 256
+LABEL_SELECTOR_PATTERN = \
+    '((?:\\b\S+ (?:in|notin) \([^\)]*\))|(?:!?\\b[^,]+\\b))'
+FIELD_SELECTOR_PATTERN = '(\\b[^,]+\\b)'
 
 
 class NamespaceSelector(object):
     def __init__(self, namespace):
         self.namespace = namespace
 
+    @property
+    def index_keys(self):
+        return [('namespace', self.namespace)]
+
+    @property
+    def column_filter(self):
+        return (('field', ('metadata', 'namespace')), (self.namespace,), False)
+
     def __call__(self, obj):
         return obj['metadata']['namespace'] == self.namespace
 
 
+class OwnerSelector(object):
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+
+    @property
+    def index_keys(self):
+        return [('owner', self.kind, self.name)]
+
+    @property
+    def column_filter(self):
+        return None
+
+    def __call__(self, obj):
+        for ref in obj['metadata'].get('ownerReferences', []):
+            if ref['kind'] == self.kind and ref['name'] == self.name:
+                return True
+        return False
+
+
 class Selector(object):
     pattern = ''
 
     def __init__(self, selector):
         self.selector = selector
+        match = re.match(self.pattern, selector)
+        self.requirements = match.groupdict() if match else None
+        if self.requirements:
+            self.compile(**self.requirements)
 
-    @property
-    def requirements(self):
-        if not hasattr(self, '_requirements'):
-            match = re.match(self.pattern, self.selector)
-            if not match:
-                return
-            self._requirements = match.groupdict()
-        return self._requirements
+    def compile(self, **requirements):
+        pass
 
     @property
     def is_available(self):
         return bool(self.requirements)
 
+    @property
+    def index_keys(self):
+        return None
+
+    @property
+    def column_filter(self):
+        return None
+
 
 class EqualityBasedSelector(Selector):
     pattern = '^(?P<key>[^!\s]+)\s*(?P<operator>=|!=)\s*(?P<value>\S+)$'
 
+    def compile(self, key, operator, value):
+        self.key = key
+        self.value = value
+        self.negate = operator == '!='
+
+    @property
+    def index_keys(self):
+        if not self.negate:
+            return [('label', self.key, self.value)]
+
+    @property
+    def column_filter(self):
+        return (('label', self.key), (self.value,), self.negate)
+
     def __call__(self, obj):
-        label_value = obj['metadata'].get('labels', {}).get(
-            self.requirements['key'])
-        return (self.requirements['operator'] == '!=') == \
-            (label_value != self.requirements['value'])
+        label_value = obj['metadata'].get('labels', {}).get(self.key)
+        return self.negate == (label_value != self.value)
 
 
 class fieldSelector(EqualityBasedSelector):
 
-    def __match(self, obj, fields):
-        field = next(fields, None)
-        if not field:
-            return (self.requirements['operator'] == '!=') == \
-                (obj != self.requirements['value'])
-        else:
-            if field in obj:
-                return self.__match(obj[field], fields)
-            else:
-                return self.requirements['operator'] == '!='
+    def compile(self, key, operator, value):
+        super(fieldSelector, self).compile(key, operator, value)
+        self.fields = tuple(re.findall('\w+', key))
+
+    @property
+    def index_keys(self):
+        if not self.negate and self.key == 'metadata.namespace':
+            return [('namespace', self.value)]
+
+    @property
+    def column_filter(self):
+        if self.fields in columns.FIELDS:
+            return (('field', self.fields), (self.value,), self.negate)
 
     def __call__(self, obj):
-        fields = iter(re.findall('\w+', self.requirements['key']))
-        return self.__match(obj, fields)
+        for field in self.fields:
+            if field not in obj:
+                return self.negate
+            obj = obj[field]
+        return self.negate == (obj != self.value)
 
 
 class SetBasedSelector(Selector):
     pattern = '^(?P<key>\S+)\s+(?P<operator>in|notin)\s+(?P<values>\(.*\))$'
 
+    def compile(self, key, operator, values):
+        self.key = key
+        self.values = frozenset(re.findall('\\b([^,]+)\\b', values))
+        self.negate = operator == 'notin'
+
+    @property
+    def index_keys(self):
+        if not self.negate:
+            return [('label', self.key, value) for value in self.values]
+
+    @property
+    def column_filter(self):
+        return (('label', self.key), self.values, self.negate)
+
     def __call__(self, obj):
-        label_value = obj['metadata'].get('labels', {}).get(
-            self.requirements['key'])
-        values = re.findall('\\b([^,]+)\\b', self.requirements['values'])
-        return (self.requirements['operator'] == 'notin') == \
-            (label_value not in values)
+        label_value = obj['metadata'].get('labels', {}).get(self.key)
+        return self.negate == (label_value not in self.values)
 
 
 class EmptyBasedSelector(Selector):
     pattern = '^(?P<empty>!?)(?P<key>\S+)$'
 
+    def compile(self, empty, key):
+        self.key = key
+        self.negate = bool(empty)
+
+    @property
+    def index_keys(self):
+        if not self.negate:
+            return [('label_key', self.key)]
+
+    @property
+    def column_filter(self):
+        return (('label', self.key), None, self.negate)
+
     def __call__(self, obj):
         labels = obj['metadata'].get('labels', {})
-        return bool(self.requirements['empty']) == \
-            (self.requirements['key'] not in labels)
+        return self.negate == (self.key not in labels)
 
 
 labelSelectors = [EqualityBasedSelector, SetBasedSelector, EmptyBasedSelector]
@@ -114,12 +201,101 @@ def as_selectors(values):
     return selectors
 
 
+class LRUCache(object):
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrap(*args):
+            with self._lock:
+                if args in self._items:
+                    value = self._items[args] = self._items.pop(args)
+                    return value
+            value = func(*args)
+            with self._lock:
+                self._items[args] = value
+                if len(self._items) > self.size:
+                    self._items.popitem(last=False)
+            return value
+        return wrap
+
+
+@LRUCache(SELECTOR_CACHE_SIZE)
+def parse_label_selector(label_selector):
+    selectors = []
+    for label in re.findall(LABEL_SELECTOR_PATTERN, label_selector):
+        for selector in labelSelectors:
+            selector_inst = selector(label)
+            if selector_inst.is_available:
+                selectors.append(selector_inst)
+                break
+        else:
+            raise Exception("Unable to parse selector '%s'" % label)
+    return tuple(selectors)
+
+
+@LRUCache(SELECTOR_CACHE_SIZE)
+def parse_field_selector(field_selector):
+    selectors = []
+    for field in re.findall(FIELD_SELECTOR_PATTERN, field_selector):
+        selector_inst = fieldSelector(field)
+        if selector_inst.is_available:
+            selectors.append(selector_inst)
+        else:
+            raise Exception("Unable to parse selector '%s'" % field)
+    return tuple(selectors)
+
+
+@contextmanager
+def gc_paused():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def clone(value):
+    if isinstance(value, dict):
+        return dict((k, clone(v)) for k, v in value.iteritems())
+    elif isinstance(value, list):
+        return [clone(v) for v in value]
+    return value
+
+
+def iter_json(content, chunk_size=65536):
+    head = json.dumps(dict((key, value) for key, value in content.iteritems()
+                           if key != 'items'))
+    chunk = [head[:-1] + (', "items": [' if len(head) > 2 else '"items": [')]
+    size = len(chunk[0])
+    encode = json.JSONEncoder().encode
+    for index, item in enumerate(content['items']):
+        data = encode(item)
+        chunk.append(', ' + data if index else data)
+        size += len(data)
+        if size >= chunk_size:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    chunk.append(']}')
+    yield ''.join(chunk)
+
+
 class JinjaEnvironment(Environment):
     def __init__(self, *args, **kwargs):
         super(JinjaEnvironment, self).__init__(*args, **kwargs)
         self.filters.update(CUSTOM_FILTERS)
 
 
+def get_template(name, source):
+    TEMPLATES.setdefault(name, source)
+    return TEMPLATE_ENV.get_template(name)
+
+
 def custom_filter(func):
     CUSTOM_FILTERS[func.__name__] = func
     return func
@@ -145,3 +321,7 @@ def random_string(value):
 def random_number(value):
     chars = string.digits
     return ''.join(random.choice(chars) for i in xrange(value))
+
+
+TEMPLATE_ENV = JinjaEnvironment(loader=FunctionLoader(TEMPLATES.get),
+                                bytecode_cache=FileSystemBytecodeCache())
@@ -0,0 +1,300 @@
+# coding=UTF-8
+import atexit
+import json
+import os
+import re
+import shutil
+import threading
+import zlib
+from collections import OrderedDict
+import snapshot
+
+
+SYNC_POLICIES = ['always', 'batch', 'interval', 'none']
+RESTORE = 'RESTORE'
+FILE_NAME = re.compile('^(log|snapshot|restore)\.(\d{8})(\.\d+)?$')
+
+
+class WALError(Exception):
+    pass
+
+
+def encode(record):
+    payload = json.dumps(record, separators=(',', ':'))
+    return '%08x %s\n' % (zlib.crc32(payload) & 0xffffffff, payload)
+
+
+def decode(line):
+    if not line.endswith('\n') or line[8:9] != ' ':
+        return None
+    payload = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload) & 0xffffffff:
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+def read_segment(path, tail=False):
+    records = []
+    offset = 0
+    with open(path, 'r+b') as f:
+        for line in f:
+            record = decode(line)
+            if record is None:
+                if not tail:
+                    raise WALError('corrupt record in %s at offset %d' %
+                                   (path, offset))
+                f.truncate(offset)
+                break
+            records.append(record)
+            offset += len(line)
+    return records, offset
+
+
+def sync_directory(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog(object):
+    def __init__(self, directory, sync='batch', sync_interval=1.0,
+                 commit_delay=0, compact_bytes=64 * 1024 * 1024):
+        if sync not in SYNC_POLICIES:
+            raise ValueError('sync must be one of: %s' %
+                             ', '.join(SYNC_POLICIES))
+        self.directory = directory
+        self.sync = sync
+        self.sync_interval = sync_interval
+        self.commit_delay = commit_delay
+        self.compact_bytes = compact_bytes
+        self.store = None
+        self.resources = set()
+        self.size = 0
+        self._records = {}
+        self._sources = {}
+        self._segment = 0
+        self._file = None
+        self._condition = threading.Condition()
+        self._buffer = []
+        self._sequence = 0
+        self._synced = 0
+        self._flushing = False
+        self._compacting = False
+        self._directory_synced = True
+        self._syncer = None
+
+    @classmethod
+    def from_config(cls, config, cache_config):
+        return cls(config.get('WAL_DIR') or
+                   os.path.join(cache_config['CACHE_DIR'], 'wal'),
+                   sync=config.get('WAL_SYNC', 'batch'),
+                   sync_interval=config.get('WAL_SYNC_INTERVAL', 1.0),
+                   commit_delay=config.get('WAL_COMMIT_DELAY', 0),
+                   compact_bytes=config.get('WAL_COMPACT_BYTES',
+                                            64 * 1024 * 1024))
+
+    def _path(self, kind, segment):
+        return os.path.join(self.directory, '%s.%08d' % (kind, segment))
+
+    def _open(self):
+        self._file = open(self._path('log', self._segment), 'ab')
+        sync_directory(self.directory)
+
+    def bind(self, store):
+        self.store = store
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        files = {'log': [], 'snapshot': [], 'restore': []}
+        for name in os.listdir(self.directory):
+            match = FILE_NAME.match(name)
+            if match:
+                files[match.group(1)].append(int(match.group(2)))
+            elif name.endswith('.tmp'):
+                os.remove(os.path.join(self.directory, name))
+        logs, snapshots = sorted(files['log']), sorted(files['snapshot'])
+        start = snapshots[-1] if snapshots else 0
+        self._remove_before(start)
+        revision = 0
+        if snapshots:
+            revision, self._sources = snapshot.open_snapshot(
+                self._path('snapshot', start))
+            self.resources.update(self._sources)
+        logs = [segment for segment in logs if segment >= start]
+        for segment in logs:
+            records, size = read_segment(self._path('log', segment),
+                                         tail=segment == logs[-1])
+            self.size += size
+            for record in records:
+                revision = max(revision, record[0])
+                if record[1] == RESTORE:
+                    self._sources = snapshot.open_snapshot(
+                        os.path.join(self.directory, record[5]))[1]
+                    self._records = {}
+                    self.resources = set(self._sources)
+                    continue
+                self.resources.add(record[2])
+                self._records.setdefault(record[2], []).append(record)
+        self._segment = logs[-1] if logs else max(start, 1)
+        self._open()
+        atexit.register(self.close)
+        return revision
+
+    def load(self, resource):
+        objects = OrderedDict()
+        source = self._sources.pop(resource, None)
+        if source is not None:
+            for obj in source[1]():
+                metadata = obj['metadata']
+                objects[(metadata.get('namespace'), metadata['name'])] = obj
+        for _, _, _, namespace, name, obj in self._records.pop(resource, ()):
+            objects.pop((namespace, name), None)
+            if obj is not None:
+                metadata = obj['metadata']
+                objects[(metadata.get('namespace'), metadata['name'])] = obj
+        return objects.values()
+
+    def save(self, resource, objects, changes):
+        with self._condition:
+            self.resources.add(resource)
+            return self._append(''.join(
+                encode([revision, event_type, resource, key[0], key[1], obj])
+                for revision, event_type, key, obj in changes))
+
+    def restore(self, sources, revision, path):
+        with self._condition:
+            name = 'restore.%08d.%d' % (self._segment, revision)
+            target = os.path.join(self.directory, name)
+            try:
+                os.link(path, target)
+            except OSError:
+                shutil.copyfile(path, target + '.tmp')
+                with open(target + '.tmp', 'rb') as f:
+                    os.fsync(f.fileno())
+                os.rename(target + '.tmp', target)
+            if self.sync == 'batch':
+                self._directory_synced = False
+            else:
+                sync_directory(self.directory)
+            self._sources = {}
+            self._records = {}
+            self.resources = set(sources)
+            return self._append(encode([revision, RESTORE, None, None, None,
+                                        name]))
+
+    def _append(self, data):
+        with self._condition:
+            ticket = None
+            if self.sync == 'batch':
+                self._buffer.append(data)
+                self._sequence += 1
+                ticket = self._sequence
+            else:
+                self._file.write(data)
+                if self.sync == 'always':
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                elif self.sync == 'none':
+                    self._file.flush()
+                elif self._syncer is None:
+                    self._syncer = threading.Thread(target=self._sync_loop)
+                    self._syncer.daemon = True
+                    self._syncer.start()
+            self.size += len(data)
+            if self.size > self.compact_bytes and not self._compacting:
+                self._compacting = True
+                compactor = threading.Thread(target=self.compact)
+                compactor.daemon = True
+                compactor.start()
+        return ticket
+
+    def wait(self, ticket):
+        with self._condition:
+            while self._synced < ticket:
+                if self._flushing:
+                    self._condition.wait()
+                else:
+                    self._flush()
+
+    def _flush(self):
+        self._flushing = True
+        try:
+            if self.commit_delay:
+                self._condition.wait(self.commit_delay)
+            data, self._buffer = ''.join(self._buffer), []
+            sequence = self._sequence
+            f = self._file
+            directory_synced, self._directory_synced = \
+                self._directory_synced, True
+            self._condition.release()
+            try:
+                if not directory_synced:
+                    sync_directory(self.directory)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                self._condition.acquire()
+            self._synced = sequence
+        finally:
+            self._flushing = False
+            self._condition.notify_all()
+
+    def _sync_loop(self):
+        with self._condition:
+            while not self._file.closed:
+                self._condition.wait(self.sync_interval)
+                if not self._flushing and not self._file.closed:
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._condition:
+            while self._flushing:
+                self._condition.wait()
+            if self._file is None or self._file.closed:
+                return
+            self._file.write(''.join(self._buffer))
+            self._buffer = []
+            self._synced = self._sequence
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._condition.notify_all()
+        if self._syncer is not None:
+            self._syncer.join()
+
+    def _rotate(self):
+        with self._condition:
+            while self._flushing:
+                self._condition.wait()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._segment += 1
+            self._open()
+            self.size = 0
+            return self._segment
+
+    def _remove_before(self, segment):
+        for name in os.listdir(self.directory):
+            match = FILE_NAME.match(name)
+            if match and int(match.group(2)) < segment:
+                os.remove(os.path.join(self.directory, name))
+
+    def compact(self):
+        try:
+            segment = self._rotate()
+            with self._condition:
+                resources = sorted(self.resources)
+            snapshot.save(self.store, resources,
+                          self._path('snapshot', segment))
+            sync_directory(self.directory)
+            self._remove_before(segment)
+        finally:
+            with self._condition:
+                self._compacting = False
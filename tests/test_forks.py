@@ -0,0 +1,94 @@
+# coding=UTF-8
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'fake_k8s'))
+import store
+
+
+def node(name, **labels):
+    return {'apiVersion': 'v1', 'kind': 'Node',
+            'metadata': {'name': name, 'labels': labels}}
+
+
+class ForkedStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.forked = store.ForkedStore(store.MemoryStore())
+        self.forked.create_many('nodes', [node('n1'), node('n2'),
+                                          node('n3')])
+
+    def names(self, fork=None, selectors=()):
+        self.forked.select(fork)
+        try:
+            return [obj['metadata']['name']
+                    for obj in self.forked.query('nodes', selectors)]
+        finally:
+            self.forked.select(None)
+
+    def test_fork_lists_in_parent_order(self):
+        self.forked.fork('f1')
+        self.forked.select('f1')
+        self.forked.update('nodes', None, 'n1', node('n1', zone='z1'))
+        self.forked.delete('nodes', None, 'n2')
+        self.forked.create('nodes', node('n0'))
+        self.forked.select(None)
+        self.assertEqual(self.names(), ['n1', 'n2', 'n3'])
+        self.assertEqual(self.names('f1'), ['n1', 'n3', 'n0'])
+        selector = store.utils.parse_label_selector('zone=z1')
+        self.assertEqual(self.names('f1', selector), ['n1'])
+        self.assertEqual(self.names(None, selector), [])
+
+    def test_writes_to_parent_do_not_leak(self):
+        self.forked.fork('f1')
+        self.forked.update('nodes', None, 'n2', node('n2', zone='z1'))
+        self.forked.delete('nodes', None, 'n3')
+        self.assertEqual(self.names('f1'), ['n1', 'n2', 'n3'])
+        self.forked.select('f1')
+        self.assertEqual(self.forked.get('nodes', None, 'n2')['metadata'],
+                         {'name': 'n2', 'labels': {},
+                          'resourceVersion': '2'})
+        self.forked.select(None)
+
+    def assert_pages_cover_list(self):
+        expected = [obj['metadata']['name'] for obj in sorted(
+            self.forked.list('nodes'), key=store.object_key)]
+        for limit in range(1, len(expected) + 1):
+            names, last = [], None
+            while True:
+                _, items, last, _ = self.forked.page('nodes', (), limit,
+                                                     last)
+                self.assertLessEqual(len(items), limit)
+                names.extend(obj['metadata']['name'] for obj in items)
+                if last is None:
+                    break
+            self.assertEqual(names, expected)
+
+    def test_fork_pages_cover_every_object(self):
+        self.forked.create_many('nodes', [node('n%d' % i)
+                                          for i in range(4, 7)])
+        self.forked.fork('f1')
+        self.forked.select('f1')
+        self.forked.delete('nodes', None, 'n2')
+        self.assert_pages_cover_list()
+        self.forked.create('nodes', node('n45'))
+        self.assert_pages_cover_list()
+        self.forked.update('nodes', None, 'n5', node('n5', zone='z1'))
+        self.assert_pages_cover_list()
+        _, items, _, _ = self.forked.page('nodes', (), 10)
+        self.assertEqual([obj['metadata']['labels'] for obj in items
+                          if obj['metadata']['name'] == 'n5'],
+                         [{'zone': 'z1'}])
+        self.forked.select(None)
+
+    def test_drop_with_children(self):
+        self.forked.fork('f1')
+        self.forked.fork('f2', 'f1')
+        self.assertRaises(store.Conflict, self.forked.drop, 'f1')
+        self.forked.drop('f2')
+        self.forked.drop('f1')
+        self.assertEqual(list(self.forked.forks), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# coding=UTF-8
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'fake_k8s'))
+import scheduler
+import snapshot
+import store
+
+
+def node(name, zone='z0', unschedulable=False):
+    return {'apiVersion': 'v1', 'kind': 'Node',
+            'metadata': {'name': name, 'labels': {'zone': zone}},
+            'spec': {'unschedulable': True} if unschedulable else {},
+            'status': {'allocatable': {'cpu': '8', 'memory': '16Gi',
+                                       'pods': '110'}}}
+
+
+def pod(name, **spec):
+    spec.setdefault('containers', [{'name': 'c', 'image': 'nginx'}])
+    return {'apiVersion': 'v1', 'kind': 'Pod',
+            'metadata': {'name': name, 'namespace': 'default'},
+            'spec': spec}
+
+
+class SchedulerTest(object):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='fake_k8s_test')
+        self.store = self.create_store()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def place(self, scheduler_, count=20, **spec):
+        placement = scheduler_.placement()
+        return set(placement(pod('p', **spec))['metadata']['name']
+                   for _ in xrange(count))
+
+    def test_selectors_and_unschedulable(self):
+        self.store.create_many('nodes', [
+            node('n0', 'z0'), node('n1', 'z1'),
+            node('n2', 'z1', unschedulable=True)])
+        scheduler_ = scheduler.Scheduler(self.store, seed=1)
+        self.assertEqual(self.place(scheduler_, nodeSelector={'zone': 'z1'}),
+                         set(['n1']))
+        self.assertEqual(self.place(scheduler_, nodeName='n2'), set(['n2']))
+        affinity = {'nodeAffinity': {
+            'requiredDuringSchedulingIgnoredDuringExecution': {
+                'nodeSelectorTerms': [{'matchExpressions': [
+                    {'key': 'zone', 'operator': 'NotIn',
+                     'values': ['z1']}]}]}}}
+        self.assertEqual(self.place(scheduler_, affinity=affinity),
+                         set(['n0']))
+        placement = scheduler_.placement()
+        self.assertIsNone(placement(pod('p', nodeSelector={'zone': 'z9'})))
+
+    def test_node_changes(self):
+        self.store.create_many('nodes', [node('n0'), node('n1')])
+        scheduler_ = scheduler.Scheduler(self.store, seed=1)
+        self.assertEqual(self.place(scheduler_), set(['n0', 'n1']))
+        self.store.update('nodes', None, 'n0',
+                          node('n0', unschedulable=True))
+        self.store.create('nodes', node('n2'))
+        self.store.delete('nodes', None, 'n1')
+        self.assertEqual(self.place(scheduler_), set(['n2']))
+
+    def test_restore_resets_index(self):
+        path = os.path.join(self.directory, 'nodes.snap')
+        self.store.create('nodes', node('old-a'))
+        snapshot.save(self.store, ['nodes'], path)
+        self.store.delete('nodes', None, 'old-a')
+        self.store.create('nodes', node('new-b'))
+        scheduler_ = scheduler.Scheduler(self.store, seed=1)
+        self.assertEqual(self.place(scheduler_), set(['new-b']))
+        snapshot.restore(self.store, ['nodes'], path)
+        self.assertEqual(self.place(scheduler_), set(['old-a']))
+
+    def test_seeded_spread(self):
+        self.store.create_many('nodes', [node('n%d' % i) for i in xrange(4)])
+        names = []
+        for _ in xrange(2):
+            placement = scheduler.Scheduler(self.store, 'spread',
+                                            seed=7).placement()
+            names.append([placement(pod('p'))['metadata']['name']
+                          for _ in xrange(8)])
+        self.assertEqual(names[0], names[1])
+        self.assertEqual(sorted(names[0]),
+                         sorted(['n0', 'n1', 'n2', 'n3'] * 2))
+
+
+class MemorySchedulerTest(SchedulerTest, unittest.TestCase):
+    def create_store(self):
+        return store.MemoryStore()
+
+
+class SQLiteSchedulerTest(SchedulerTest, unittest.TestCase):
+    def create_store(self):
+        return store.SQLiteStore(path=os.path.join(self.directory, 'db'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+# coding=UTF-8
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+PACKAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       os.pardir, 'fake_k8s')
+sys.path.insert(0, PACKAGE)
+import settings
+
+
+CACHE_DIR = tempfile.mkdtemp(prefix='fake_k8s_test')
+HAS_SWAGGER = os.path.exists(os.path.join(PACKAGE, 'swagger.json'))
+if HAS_SWAGGER:
+    settings.CACHE_CONFIG = dict(settings.CACHE_CONFIG, CACHE_DIR=CACHE_DIR)
+    settings.STORE_CONFIG = dict(settings.STORE_CONFIG, FORKS=True)
+    settings.METRICS = settings.SERVER_TIMING = settings.PROFILER = True
+    import metrics
+    import server
+
+
+def tearDownModule():
+    shutil.rmtree(CACHE_DIR, True)
+
+
+def namespace(name):
+    return {'apiVersion': 'v1', 'kind': 'Namespace',
+            'metadata': {'name': name}}
+
+
+def pod(name, namespace='default', **labels):
+    return {'apiVersion': 'v1', 'kind': 'Pod',
+            'metadata': {'name': name, 'namespace': namespace,
+                         'labels': labels},
+            'spec': {'containers': [{'name': 'c', 'image': 'nginx'}]}}
+
+
+@unittest.skipUnless(HAS_SWAGGER, 'swagger.json is fetched at image build')
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.client = server.app.test_client()
+        self.namespace = self.id().rsplit('.', 1)[-1].replace('_', '-')
+        self.request('post', '/api/v1/namespaces',
+                     namespace(self.namespace), 201)
+
+    def tearDown(self):
+        for name in server.STORE.forks.keys()[::-1]:
+            server.STORE.drop(name)
+
+    def request(self, method, url, body=None, code=None, **kwargs):
+        if body is not None and not isinstance(body, basestring):
+            body = json.dumps(body)
+        response = getattr(self.client, method)(url, data=body, buffered=True,
+                                                **kwargs)
+        if code is not None:
+            self.assertEqual(response.status_code, code, response.data)
+        return response
+
+    def names(self, url):
+        return [obj['metadata']['name']
+                for obj in json.loads(self.request('get', url, code=200).data)
+                ['items']]
+
+    def pods_url(self, prefix=''):
+        return '%s/api/v1/namespaces/%s/pods' % (prefix, self.namespace)
+
+
+class ListServerTest(ServerTest):
+    def test_list_pages(self):
+        for i in range(5):
+            self.request('post', self.pods_url(),
+                         pod('p%d' % i, self.namespace), 201)
+        body = json.loads(self.request('get', self.pods_url() + '?limit=2',
+                                       code=200).data)
+        pages = [body['items']]
+        while body['metadata'].get('continue'):
+            body = json.loads(self.request(
+                'get', self.pods_url() + '?limit=2&continue=%s' %
+                body['metadata']['continue'], code=200).data)
+            pages.append(body['items'])
+        self.assertEqual([[obj['metadata']['name'] for obj in items]
+                          for items in pages],
+                         [['p0', 'p1'], ['p2', 'p3'], ['p4']])
+
+    def test_watch(self):
+        revision = json.loads(self.request(
+            'get', self.pods_url(), code=200).data)['metadata'][
+            'resourceVersion']
+        self.request('post', self.pods_url(), pod('a', self.namespace), 201)
+        self.request('delete', self.pods_url() + '/a', code=200)
+        response = self.request(
+            'get', self.pods_url() + '?watch=true&resourceVersion=%s'
+            '&timeoutSeconds=0' % revision, code=200)
+        self.assertEqual(
+            [(event['type'], event['object']['metadata']['name'])
+             for event in map(json.loads, response.data.splitlines())],
+            [('ADDED', 'a'), ('DELETED', 'a')])
+
+
+class MetricsServerTest(ServerTest):
+    def watch_seconds(self):
+        for line in self.request('get', '/metrics', code=200).data.split(
+                '\n'):
+            if line.startswith('fake_k8s_request_duration_seconds_sum{'
+                               'verb="watch",resource="pods"}'):
+                return float(line.split()[-1])
+        return 0.0
+
+    def test_streamed_watch_is_timed_to_the_end(self):
+        before = self.watch_seconds()
+        response = self.request(
+            'get', self.pods_url() + '?watch=true&timeoutSeconds=1',
+            code=200)
+        self.assertIn('total;dur=', response.headers['Server-Timing'])
+        self.assertGreaterEqual(self.watch_seconds() - before, 1.0)
+
+
+    def test_unknown_resources_share_one_escaped_series(self):
+        for name in ['fo%22o', 'b%5Car', 'ba%0Az']:
+            self.request('get', '/api/v1/namespaces/%s/%s' %
+                         (self.namespace, name))
+        self.request('get', '/apis/made.up/v1/things')
+        lines = self.request('get', '/metrics', code=200).data.splitlines()
+        sample = re.compile(r'^[a-z0-9_]+(\{([a-z]+="([^"\\\n]|\\.)*",?)*\})? '
+                            r'\S+$')
+        self.assertEqual([line for line in lines if not line.startswith('#')
+                          and not sample.match(line)], [])
+        self.assertIn('fake_k8s_request_duration_seconds_count{verb="list",'
+                      'resource="unknown"}', '\n'.join(lines))
+        self.assertNotIn('things', '\n'.join(lines))
+        registry = metrics.Registry()
+        registry.observe('get', 'a"b\\c\nd', 0.1, {})
+        self.assertIn('resource="a\\"b\\\\c\\nd"',
+                      registry.render(server.STORE))
+
+
+class ProfilerServerTest(ServerTest):
+    def start_profile(self, mode, requests):
+        self.request('post', '/debug/profile?mode=%s&requests=%d' %
+                     (mode, requests), code=202)
+
+    def test_streamed_watch_is_profiled(self):
+        for mode, output_format in [('cprofile', 'text'),
+                                    ('sampling', 'collapsed')]:
+            self.start_profile(mode, 1)
+            self.request('get', self.pods_url() +
+                         '?watch=true&timeoutSeconds=1', code=200)
+            self.assertIn('follow', self.request(
+                'get', '/debug/profile?format=%s' % output_format,
+                code=200).data)
+            self.assertIsNone(sys.getprofile())
+
+    def test_failed_request_stops_profiling(self):
+        self.start_profile('cprofile', 2)
+        self.request('post', self.pods_url(), '{}', 500,
+                     content_type='text/plain')
+        self.assertIsNone(sys.getprofile())
+        status = json.loads(self.request(
+            'get', '/debug/profile', code=409).data)['message']
+        self.assertEqual(json.loads(status.split(': ', 1)[1])['requests'], 1)
+        self.request('get', '/version', code=200)
+        self.request('get', '/debug/profile', code=200)
+
+
+class ForkServerTest(ServerTest):
+    def test_fork_prefix_routes_every_endpoint(self):
+        self.request('post', self.pods_url(), pod('p1', self.namespace), 201)
+        self.request('post', '/forks/f1', code=201)
+        self.request('post', '/forks/f1/load', '\n'.join(
+            json.dumps(pod(name, self.namespace)) for name in ['p2', 'p3']),
+            201, content_type='application/x-ndjson')
+        self.assertEqual(self.names(self.pods_url('/forks/f1')),
+                         ['p1', 'p2', 'p3'])
+        self.assertEqual(self.names(self.pods_url()), ['p1'])
+        name = '%s-f1' % self.namespace
+        self.request('post', '/forks/f1/snapshots/%s' % name, code=201)
+        self.request('delete', self.pods_url('/forks/f1') + '/p1', code=200)
+        self.request('post', '/forks/f1/snapshots/%s/restore' % name,
+                     code=200)
+        self.assertEqual(self.names(self.pods_url('/forks/f1')),
+                         ['p1', 'p2', 'p3'])
+        self.assertEqual(self.names(self.pods_url()), ['p1'])
+        self.request('get', '/forks/f1/forks/f1/version', code=404)
+
+    def test_drop_fork_with_children(self):
+        self.request('post', '/forks/f1', code=201)
+        self.request('post', '/forks/f2?from=f1', code=201)
+        self.request('delete', '/forks/f1', code=409)
+        self.request('delete', '/forks/f2', code=200)
+        self.request('delete', '/forks/f1', code=200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# coding=UTF-8
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'fake_k8s'))
+import events
+import snapshot
+import store
+
+
+def node(name):
+    return {'apiVersion': 'v1', 'kind': 'Node',
+            'metadata': {'name': name, 'labels': {}}}
+
+
+class RestoreTest(object):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='fake_k8s_test')
+        self.store = self.create_store()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def names(self):
+        return sorted(obj['metadata']['name']
+                      for obj in self.store.list('nodes'))
+
+    def test_restore_advances_revision(self):
+        path = os.path.join(self.directory, 'nodes.snap')
+        self.store.create('nodes', node('a'))
+        snapshot.save(self.store, ['nodes'], path)
+        self.store.delete('nodes', None, 'a')
+        self.store.create('nodes', node('b'))
+        before = self.store.revision
+        result = snapshot.restore(self.store, ['nodes'], path)
+        self.assertEqual(self.names(), ['a'])
+        self.assertGreater(self.store.revision, before)
+        self.assertEqual(result['resourceVersion'], str(self.store.revision))
+        self.assertRaises(events.Expired, self.store.events.since, 'nodes',
+                          before)
+        stream = self.store.watch('nodes', (), 0, before)
+        event_type, status = next(stream)
+        self.assertEqual(event_type, events.ERROR)
+        self.assertEqual(status['code'], 410)
+        self.assertRaises(events.Expired, self.store.page, 'nodes', (), 1,
+                          None, before)
+        revision, items, _, _ = self.store.page('nodes', (), 1)
+        self.assertEqual(revision, self.store.revision)
+        self.assertEqual([obj['metadata']['name'] for obj in items], ['a'])
+
+
+class MemoryRestoreTest(RestoreTest, unittest.TestCase):
+    def create_store(self):
+        return store.MemoryStore()
+
+
+class SQLiteRestoreTest(RestoreTest, unittest.TestCase):
+    def create_store(self):
+        return store.SQLiteStore(path=os.path.join(self.directory, 'db'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+# coding=UTF-8
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'fake_k8s'))
+import events
+import store
+
+
+def node(name):
+    return {'apiVersion': 'v1', 'kind': 'Node',
+            'metadata': {'name': name, 'labels': {}}}
+
+
+def in_thread(target, *args):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(target(*args)))
+    thread.start()
+    return thread, results
+
+
+class SQLiteStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='fake_k8s_test')
+        self.store = store.SQLiteStore(
+            path=os.path.join(self.directory, 'store.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_connections_are_shared_between_threads(self):
+        opened = []
+        open_connection = self.store._open
+
+        def counting_open():
+            opened.append(1)
+            return open_connection()
+
+        self.store._open = counting_open
+        self.store.create('nodes', node('a'))
+        for _ in range(5):
+            thread, results = in_thread(self.store.list, 'nodes')
+            thread.join()
+            self.assertEqual(len(results[0]), 1)
+        self.assertEqual(len(opened), 1)
+        self.assertEqual(len(self.store._pool), 1)
+
+    def test_follow_queries_outside_the_lock(self):
+        locked = []
+        events_since = self.store.events_since
+
+        def checking_events_since(connection, resource, revision):
+            locked.append(self.store.events._lock.locked())
+            return events_since(connection, resource, revision)
+
+        self.store.events_since = checking_events_since
+        revision = self.store.revision
+        thread, results = in_thread(
+            next, self.store.events.follow('nodes', revision, 5))
+        self.store.create('nodes', node('a'))
+        thread.join()
+        self.assertEqual(results[0].obj['metadata']['name'], 'a')
+        self.assertTrue(locked)
+        self.assertFalse(any(locked))
+
+    def test_follow_wakes_on_reset(self):
+        self.store.create('nodes', node('a'))
+        revision = self.store.revision
+        stream = self.store.watch('nodes', (), 5, revision)
+        thread, results = in_thread(next, stream)
+        self.store.restore({}, revision)
+        thread.join()
+        event_type, status = results[0]
+        self.assertEqual(event_type, events.ERROR)
+        self.assertEqual(status['code'], 410)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+# coding=UTF-8
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'fake_k8s'))
+import events
+import store
+import utils
+
+
+def pod(name, namespace='default', **labels):
+    return {'apiVersion': 'v1', 'kind': 'Pod',
+            'metadata': {'name': name, 'namespace': namespace,
+                         'labels': labels}}
+
+
+def names(objs):
+    return [obj['metadata']['name'] for obj in objs]
+
+
+class StoreTest(object):
+    counts_remaining = True
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='fake_k8s_test')
+        self.store = self.create_store()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_crud(self):
+        created = self.store.create('pods', pod('a', app='web'))
+        version = created['metadata']['resourceVersion']
+        self.assertEqual(self.store.get('pods', 'default', 'a')['metadata']
+                         ['resourceVersion'], version)
+        self.assertRaises(store.AlreadyExists, self.store.create, 'pods',
+                          pod('a'))
+        self.assertRaises(store.Conflict, self.store.update, 'pods',
+                          'default', 'a', pod('a'), version + '0')
+        updated = self.store.update('pods', 'default', 'a',
+                                    pod('a', app='db'), version)
+        self.assertNotEqual(updated['metadata']['resourceVersion'], version)
+        self.assertIsNone(self.store.update('pods', 'default', 'b', pod('b')))
+        self.assertEqual(names(self.store.query(
+            'pods', utils.parse_label_selector('app=db'))), ['a'])
+        self.assertEqual(self.store.query(
+            'pods', utils.parse_label_selector('app=web')), [])
+        self.assertEqual(self.store.delete('pods', 'default', 'a')
+                         ['metadata']['name'], 'a')
+        self.assertIsNone(self.store.delete('pods', 'default', 'a'))
+        self.assertEqual(self.store.list('pods'), [])
+
+    def test_create_many_rejects_existing(self):
+        self.store.create('pods', pod('a', app='1'))
+        revision = self.store.revision
+        self.assertRaises(store.AlreadyExists, self.store.create_many, 'pods',
+                          [pod('b'), pod('a', app='2')])
+        self.assertRaises(store.AlreadyExists, self.store.create_many, 'pods',
+                          [pod('c'), pod('c')])
+        self.assertEqual(self.store.revision, revision)
+        self.assertEqual([(obj['metadata']['name'], obj['metadata']['labels'])
+                          for obj in self.store.list('pods')],
+                         [('a', {'app': '1'})])
+
+    def test_page(self):
+        self.store.create_many('pods', [pod('p%d' % i, 'ns1' if i < 3 else
+                                            'ns2') for i in range(5)])
+        revision, items, last, remaining = self.store.page('pods', (), 2)
+        self.assertEqual(names(items), ['p0', 'p1'])
+        self.assertEqual(remaining, 3 if self.counts_remaining else None)
+        self.store.delete('pods', 'ns1', 'p2')
+        self.store.create('pods', pod('p5', 'ns1'))
+        pages = [items]
+        while last is not None:
+            _, items, last, _ = self.store.page('pods', (), 2, last,
+                                                revision)
+            pages.append(items)
+        self.assertEqual([names(items) for items in pages],
+                         [['p0', 'p1'], ['p2', 'p3'], ['p4']])
+        _, items, last, _ = self.store.page('pods', (), 10,
+                                            namespace='ns1')
+        self.assertEqual(names(items), ['p0', 'p1', 'p5'])
+        self.assertIsNone(last)
+
+    def test_watch(self):
+        self.store.create('pods', pod('a', app='web'))
+        revision = self.store.revision
+        self.store.create('pods', pod('b', app='web'))
+        self.store.update('pods', 'default', 'a', pod('a', app='db'))
+        self.store.delete('pods', 'default', 'b')
+        selectors = utils.parse_label_selector('app=web')
+        self.assertEqual(
+            [(event_type, obj['metadata']['name']) for event_type, obj in
+             self.store.watch('pods', selectors, 0, revision)],
+            [(events.ADDED, 'b'), (events.DELETED, 'a'),
+             (events.DELETED, 'b')])
+        self.assertEqual(
+            [(event_type, obj['metadata']['name']) for event_type, obj in
+             self.store.watch('pods', (), 0)], [(events.ADDED, 'a')])
+
+
+class MemoryStoreTest(StoreTest, unittest.TestCase):
+    def create_store(self):
+        return store.MemoryStore()
+
+
+class ForkStoreTest(StoreTest, unittest.TestCase):
+    counts_remaining = False
+
+    def create_store(self):
+        return store.ForkStore(store.MemoryStore())
+
+
+class SQLiteStoreTest(StoreTest, unittest.TestCase):
+    def create_store(self):
+        return store.SQLiteStore(path=os.path.join(self.directory, 'db'))
+
+
+if __name__ == '__main__':
+    unittest.main()
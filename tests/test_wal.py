@@ -0,0 +1,132 @@
+# coding=UTF-8
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'fake_k8s'))
+import snapshot
+import store
+import wal
+
+
+def pod(name, **labels):
+    return {'apiVersion': 'v1', 'kind': 'Pod',
+            'metadata': {'name': name, 'namespace': 'default',
+                         'labels': labels}}
+
+
+class WriteAheadLogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='fake_k8s_test')
+        self.logs = []
+
+    def tearDown(self):
+        for log in self.logs:
+            log.close()
+        shutil.rmtree(self.directory)
+
+    def open(self, **options):
+        log = wal.WriteAheadLog(os.path.join(self.directory, 'wal'),
+                                **options)
+        self.logs.append(log)
+        return store.MemoryStore(persistence=log)
+
+    def reopen(self, **options):
+        self.logs[-1].close()
+        return self.open(**options)
+
+    def state(self, store_):
+        return dict((obj['metadata']['name'], obj['metadata']['labels'])
+                    for obj in store_.list('pods'))
+
+    def write(self, store_):
+        store_.create_many('pods', [pod('a'), pod('b'), pod('c')])
+        store_.update('pods', 'default', 'b', pod('b', tier='web'))
+        store_.delete('pods', 'default', 'c')
+        store_.create('pods', pod('d'))
+
+    def test_replay_each_sync_policy(self):
+        for sync in wal.SYNC_POLICIES:
+            shutil.rmtree(os.path.join(self.directory, 'wal'), True)
+            store_ = self.open(sync=sync, sync_interval=0.01)
+            self.write(store_)
+            revision = store_.revision
+            store_ = self.reopen(sync=sync)
+            self.assertEqual(store_.revision, revision, sync)
+            self.assertEqual(self.state(store_), {
+                'a': {}, 'b': {'tier': 'web'}, 'd': {}}, sync)
+            store_.create('pods', pod('e'))
+            store_ = self.reopen(sync=sync)
+            self.assertEqual(sorted(self.state(store_)),
+                             ['a', 'b', 'd', 'e'], sync)
+
+    def test_torn_tail(self):
+        store_ = self.open()
+        self.write(store_)
+        revision = store_.revision
+        self.logs[-1].close()
+        path = self.logs[-1]._path('log', self.logs[-1]._segment)
+        size = os.path.getsize(path)
+        with open(path, 'ab') as f:
+            f.write(wal.encode([revision + 1, 'ADDED', 'pods', 'default',
+                                'torn', pod('torn')])[:-10])
+        store_ = self.open()
+        self.assertEqual(os.path.getsize(path), size)
+        self.assertEqual(store_.revision, revision)
+        self.assertEqual(sorted(self.state(store_)), ['a', 'b', 'd'])
+        store_.create('pods', pod('e'))
+        store_ = self.reopen()
+        self.assertEqual(sorted(self.state(store_)), ['a', 'b', 'd', 'e'])
+
+    def test_corrupt_segment_before_tail(self):
+        store_ = self.open()
+        store_.create('pods', pod('a'))
+        self.logs[-1]._rotate()
+        store_.create('pods', pod('b'))
+        self.logs[-1].close()
+        path = self.logs[-1]._path('log', 1)
+        with open(path, 'r+b') as f:
+            f.write('0')
+        self.assertRaises(wal.WALError, self.open)
+
+    def test_compaction(self):
+        store_ = self.open()
+        self.write(store_)
+        self.logs[-1].compact()
+        store_.create('pods', pod('e'))
+        revision = store_.revision
+        names = sorted(os.listdir(os.path.join(self.directory, 'wal')))
+        self.assertEqual(names, ['log.00000002', 'snapshot.00000002'])
+        store_ = self.reopen()
+        self.assertEqual(store_.revision, revision)
+        self.assertEqual(self.state(store_), {
+            'a': {}, 'b': {'tier': 'web'}, 'd': {}, 'e': {}})
+
+    def test_restore_is_lazy_and_replayed(self):
+        path = os.path.join(self.directory, 'pods.snap')
+        store_ = self.open()
+        self.write(store_)
+        snapshot.save(store_, ['pods'], path)
+        store_.delete('pods', 'default', 'a')
+        store_.create('pods', pod('x'))
+        revision = int(snapshot.restore(store_, ['pods', 'nodes'],
+                                        path)['resourceVersion'])
+        self.assertIn('pods', store_._sources)
+        store_.create('pods', pod('y'))
+        os.remove(path)
+        store_ = self.reopen()
+        self.assertEqual(store_.revision, revision + 1)
+        self.assertEqual(sorted(self.state(store_)), ['a', 'b', 'd', 'y'])
+        self.assertEqual(store_.list('nodes'), [])
+        self.logs[-1].compact()
+        store_ = self.reopen()
+        self.assertEqual(sorted(self.state(store_)), ['a', 'b', 'd', 'y'])
+        self.assertFalse([
+            name for name in os.listdir(os.path.join(self.directory, 'wal'))
+            if name.startswith('restore')])
+
+
+if __name__ == '__main__':
+    unittest.main()